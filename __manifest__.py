@@ -1,13 +1,28 @@
 {
     "name": "Custom Automation Rules",
-    "version": "16.0.1.0.0",
+    "version": "16.0.1.1.0",
     "depends": ["sale", "crm"],
     "author": "MATES Inc",
     "category": "Automation",
     "summary": "Central place for all custom automation rules!!! v1.0.1",
     "license": "LGPL-3",
     "data": [
+        "security/ir.model.access.csv",
         "data/cron_move_to_picking.xml",
+        "data/cron_close_superseded_activities.xml",
+        "data/cron_process_pending_automation.xml",
+        "data/cron_offload_installation_photos.xml",
+        "data/activity_checklist_data.xml",
+        "views/activity_checklist_views.xml",
+        "views/installation_crew_views.xml",
+        "views/installation_capacity_views.xml",
+        "views/crm_lead_views.xml",
     ],
+    "assets": {
+        "web.assets_backend": [
+            "solar_algarve_automations/static/src/js/*.js",
+            "solar_algarve_automations/static/src/xml/*.xml",
+        ],
+    },
     "installable": True
 } 
@@ -0,0 +1,85 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+import odoo
+from odoo.cli import Command
+
+_logger = logging.getLogger(__name__)
+
+JOB = 'lead_automation_backfill'
+
+
+def _run_shard(dbname, uid, mode, checkpoint_id):
+    """Worker entry point: process one shard in its own cursor and commit it"""
+    registry = odoo.modules.registry.Registry(dbname)
+    started = time.monotonic()
+    try:
+        with registry.cursor() as cr:
+            env = odoo.api.Environment(cr, uid, {})
+            checkpoint = env['automation.checkpoint'].browse(checkpoint_id)
+            processed = env['crm.lead']._backfill_shard(checkpoint, mode=mode)
+        return checkpoint_id, processed, time.monotonic() - started, None
+    except Exception as e:
+        _logger.exception("Backfill shard %s failed", checkpoint_id)
+        with registry.cursor() as cr:
+            env = odoo.api.Environment(cr, uid, {})
+            env['automation.checkpoint'].browse(checkpoint_id).write({'state': 'failed', 'message': str(e)})
+        return checkpoint_id, 0, time.monotonic() - started, str(e)
+
+
+class AutomationBackfill(Command):
+    """Re-run stage and progress automation over historical leads with a pool of workers"""
+    name = 'automation_backfill'
+
+    def run(self, cmdargs):
+        parser = argparse.ArgumentParser(
+            prog=f'{Path(sys.argv[0]).name} {self.name}',
+            description="Re-run the stage activities and installation progress automation over all leads. "
+                        "Leads are sharded by id range; every shard is committed with its checkpoint, "
+                        "so an interrupted run resumes where it stopped.",
+        )
+        parser.add_argument('-c', '--config', dest='config', help="Odoo configuration file")
+        parser.add_argument('-d', '--database', dest='database', required=True)
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Number of worker processes")
+        parser.add_argument('--shard-size', type=int, default=1000, help="Number of lead ids per shard")
+        parser.add_argument('--mode', choices=['all', 'stage', 'progress'], default='all')
+        parser.add_argument('--reset', action='store_true', help="Discard the checkpoints of a previous run")
+        parser.add_argument('--uid', type=int, default=odoo.SUPERUSER_ID)
+        args = parser.parse_args(cmdargs)
+
+        config_args = ['-d', args.database]
+        if args.config:
+            config_args += ['-c', args.config]
+        odoo.tools.config.parse_config(config_args)
+
+        registry = odoo.modules.registry.Registry(args.database)
+        with registry.cursor() as cr:
+            env = odoo.api.Environment(cr, args.uid, {})
+            shard_ids = env['automation.checkpoint']._prepare_shards(
+                JOB, 'crm.lead', args.shard_size, reset=args.reset).ids
+        if not shard_ids:
+            print("Nothing to backfill: every lead was covered by a previous run (use --reset to run again).")
+            return
+
+        # forked workers must open their own connections
+        odoo.sql_db.close_all()
+        print(f"Backfilling {len(shard_ids)} shards with {args.workers} workers (mode: {args.mode})")
+        started = time.monotonic()
+        total = failed = 0
+        worker = partial(_run_shard, args.database, args.uid, args.mode)
+        with multiprocessing.get_context('fork').Pool(args.workers) as pool:
+            for done, (shard_id, processed, seconds, error) in enumerate(pool.imap_unordered(worker, shard_ids), 1):
+                total += processed
+                failed += bool(error)
+                status = f"FAILED: {error}" if error else f"{processed} leads in {seconds:.1f}s"
+                print(f"[{done}/{len(shard_ids)}] shard {shard_id}: {status}", flush=True)
+
+        elapsed = time.monotonic() - started
+        print(f"Done: {total} leads in {elapsed:.1f}s, {failed} failed shards"
+              + (" (run again to retry them)" if failed else ""))
@@ -0,0 +1,41 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import odoo
+from odoo.cli import Command
+
+
+class AutomationReplay(Command):
+    """Replay recorded lead events through the automation in a dry run"""
+    name = 'automation_replay'
+
+    def run(self, cmdargs):
+        parser = argparse.ArgumentParser(
+            prog=f'{Path(sys.argv[0]).name} {self.name}',
+            description="Replay a JSONL export of lead events through the automation rules, "
+                        "report timings, query counts and created records, then roll back.",
+        )
+        parser.add_argument('events', help="JSONL file with one event per line")
+        parser.add_argument('-c', '--config', dest='config', help="Odoo configuration file")
+        parser.add_argument('-d', '--database', dest='database', required=True)
+        parser.add_argument('--uid', type=int, default=odoo.SUPERUSER_ID, help="User to replay the events as")
+        parser.add_argument('--details', action='store_true', help="List the activities and messages that would be created")
+        args = parser.parse_args(cmdargs)
+
+        config_args = ['-d', args.database]
+        if args.config:
+            config_args += ['-c', args.config]
+        odoo.tools.config.parse_config(config_args)
+
+        registry = odoo.modules.registry.Registry(args.database)
+        with registry.cursor() as cr:
+            try:
+                env = odoo.api.Environment(cr, args.uid, {})
+                replay = env['automation.replay']
+                report = replay._replay_events(replay._read_events(args.events), with_details=args.details)
+            finally:
+                cr.rollback()
+        json.dump(report, sys.stdout, indent=2, default=str)
+        sys.stdout.write('\n')
@@ -0,0 +1,71 @@
+from werkzeug.exceptions import BadRequest
+
+from odoo import http, fields
+from odoo.http import request
+
+PHOTO_PAGE_MAX = 100
+
+
+class InstallationPhotoController(http.Controller):
+
+    @http.route('/crm/lead/<int:lead_id>/installation_photos', type='json', auth='user')
+    def installation_photos(self, lead_id, cursor=None, limit=40, order='id'):
+        """One page of a lead's installation photos, newest first.
+
+        Keyset pagination: ``cursor`` is the ``next_cursor`` of the previous
+        page, so every page costs the same whatever its position.
+        ``order`` is ``id`` (upload order) or ``capture`` (capture time).
+        """
+        lead = request.env['crm.lead'].browse(lead_id)
+        lead.check_access_rights('read')
+        lead.check_access_rule('read')
+        limit = max(1, min(int(limit), PHOTO_PAGE_MAX))
+
+        domain = [('lead_id', '=', lead.id)]
+        if order == 'capture':
+            if cursor:
+                try:
+                    capture_date, photo_id = cursor.split(',')
+                    capture_date = fields.Datetime.to_datetime(capture_date)
+                    photo_id = int(photo_id)
+                except ValueError:
+                    raise BadRequest(f"Invalid cursor {cursor!r}")
+                domain += ['|', ('capture_date', '<', capture_date),
+                           '&', ('capture_date', '=', capture_date), ('id', '<', photo_id)]
+            orderby = 'capture_date desc, id desc'
+        else:
+            if cursor:
+                if not cursor.isdigit():
+                    raise BadRequest(f"Invalid cursor {cursor!r}")
+                domain += [('id', '<', int(cursor))]
+            orderby = 'id desc'
+
+        photos = request.env['installation.photo'].search_read(
+            domain, ['name', 'capture_date', 'write_date'], limit=limit + 1, order=orderby)
+        has_more = len(photos) > limit
+        photos = photos[:limit]
+
+        next_cursor = None
+        if has_more:
+            last = photos[-1]
+            if order == 'capture':
+                next_cursor = f"{fields.Datetime.to_string(last['capture_date'])},{last['id']}"
+            else:
+                next_cursor = str(last['id'])
+
+        return {
+            'photos': [self._photo_values(photo) for photo in photos],
+            'next_cursor': next_cursor,
+        }
+
+    def _photo_values(self, photo):
+        # ``unique`` makes /web/image answer with the attachment checksum as a
+        # strong ETag and a one year immutable Cache-Control
+        unique = photo['write_date'].strftime('%Y%m%d%H%M%S')
+        return {
+            'id': photo['id'],
+            'name': photo['name'] or '',
+            'capture_date': fields.Datetime.to_string(photo['capture_date']),
+            'thumbnail_url': f"/web/image/installation.photo/{photo['id']}/image_128?unique={unique}",
+            'image_url': f"/web/image/installation.photo/{photo['id']}/image?unique={unique}",
+        }
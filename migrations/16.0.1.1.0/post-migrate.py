@@ -0,0 +1,16 @@
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    # scheduling reminders are due the day the lead reaches Picking, they must
+    # not be closed with the Scheduling stage
+    cr.execute("""
+        UPDATE mail_activity
+           SET x_automation_stage_id = NULL
+         WHERE res_model = 'crm.lead'
+           AND summary = '🔔 Installation Scheduling Reminder'
+    """)
+    env['crm.lead']._tag_legacy_automation_activities()
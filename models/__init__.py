@@ -1,3 +1,12 @@
 from . import sale_order_hooks
 
 from . import sale_order
+from . import activity_checklist
+from . import mail_activity
+from . import mail_message
+from . import automation_replay
+from . import automation_checkpoint
+from . import stage_transition
+from . import installation_crew
+from . import installation_capacity
+from . import external_storage
@@ -0,0 +1,68 @@
+from odoo import models, api, fields
+from odoo.tools import html_escape
+
+
+class AutomationChecklistTemplate(models.Model):
+    _name = 'automation.checklist.template'
+    _description = 'Automation Checklist Template'
+    _order = 'name'
+
+    name = fields.Char(required=True, translate=True)
+    active = fields.Boolean(default=True)
+    item_ids = fields.One2many('automation.checklist.template.item', 'template_id', string='Items', copy=True)
+    item_count = fields.Integer(compute='_compute_item_count', string='Checkable Items')
+
+    @api.depends('item_ids.display_type')
+    def _compute_item_count(self):
+        for template in self:
+            template.item_count = len(template.item_ids.filtered(lambda item: not item.display_type))
+
+    def _render_html(self, done_item_ids=()):
+        """Render the checklist as static HTML (used when no widget is available, e.g. chatter fallback)"""
+        self.ensure_one()
+        parts = []
+        for item in self.item_ids:
+            if item.display_type == 'line_section':
+                parts.append(f"<h4>{html_escape(item.name)}:</h4>")
+            elif item.display_type == 'line_note':
+                parts.append(f"<i>{html_escape(item.name)}</i><br/>")
+            else:
+                box = '☑' if item.id in done_item_ids else '□'
+                parts.append(f"{box} {html_escape(item.name)}<br/>")
+        return ''.join(parts)
+
+
+class AutomationChecklistTemplateItem(models.Model):
+    _name = 'automation.checklist.template.item'
+    _description = 'Automation Checklist Template Item'
+    _order = 'template_id, sequence, id'
+
+    template_id = fields.Many2one('automation.checklist.template', string='Template', required=True, ondelete='cascade', index=True)
+    sequence = fields.Integer(default=10)
+    name = fields.Char(required=True, translate=True)
+    display_type = fields.Selection([
+        ('line_section', 'Section'),
+        ('line_note', 'Note'),
+    ], default=False, help="Sections and notes are displayed but cannot be ticked")
+
+
+class AutomationChecklistState(models.Model):
+    """Tick state of a checklist item for a lead.
+
+    Rows only exist for ticked items, so an untouched checklist costs nothing
+    beyond the template reference on the activity.
+    """
+    _name = 'automation.checklist.state'
+    _description = 'Automation Checklist Item State'
+    _log_access = False
+
+    lead_id = fields.Many2one('crm.lead', string='Opportunity', required=True, ondelete='cascade', index=True)
+    template_id = fields.Many2one('automation.checklist.template', string='Template', required=True, ondelete='cascade', index=True)
+    item_id = fields.Many2one('automation.checklist.template.item', string='Item', required=True, ondelete='cascade')
+    activity_id = fields.Many2one('mail.activity', string='Activity', ondelete='set null')
+    done_date = fields.Datetime(string='Done On', default=fields.Datetime.now)
+    done_uid = fields.Many2one('res.users', string='Done By', default=lambda self: self.env.user)
+
+    _sql_constraints = [
+        ('lead_item_uniq', 'unique(lead_id, item_id)', 'A checklist item can only be ticked once per opportunity.'),
+    ]
@@ -0,0 +1,60 @@
+from odoo import models, api, fields
+
+
+class AutomationCheckpoint(models.Model):
+    """Progress of a long running automation job.
+
+    Jobs that commit as they go (crons, backfills) record here how far they
+    got, so progress is visible while they run and a restart can resume
+    instead of starting over. Sharded jobs keep one row per shard.
+    """
+    _name = 'automation.checkpoint'
+    _description = 'Automation Job Checkpoint'
+    _order = 'job, shard_start'
+
+    job = fields.Char(required=True, index=True)
+    shard_start = fields.Integer(string='Shard Start', default=0, help="First record id of the shard (inclusive)")
+    shard_end = fields.Integer(string='Shard End', default=0, help="Last record id of the shard (exclusive)")
+    last_id = fields.Integer(string='Last Processed Id')
+    processed = fields.Integer()
+    skipped = fields.Integer(help="Records left unprocessed, e.g. still locked after all retries")
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], default='pending', required=True)
+    message = fields.Char()
+
+    _sql_constraints = [
+        ('job_shard_uniq', 'unique(job, shard_start)', 'A job can only have one checkpoint per shard.'),
+    ]
+
+    @api.model
+    def _get_checkpoint(self, job, shard_start=0, shard_end=0):
+        checkpoint = self.search([('job', '=', job), ('shard_start', '=', shard_start)], limit=1)
+        if not checkpoint:
+            checkpoint = self.create({'job': job, 'shard_start': shard_start, 'shard_end': shard_end})
+        return checkpoint
+
+    @api.model
+    def _prepare_shards(self, job, model_name, shard_size, reset=False):
+        """Split the ids of ``model_name`` into shards of ``shard_size`` ids and return those left to do
+
+        Existing checkpoints of ``job`` are reused unless ``reset``, so an
+        interrupted run resumes with the shards that did not finish; records
+        created since the previous run get new shards after the existing ones.
+        """
+        checkpoints = self.search([('job', '=', job)])
+        if reset:
+            checkpoints.unlink()
+            checkpoints = self.browse()
+        self.env.cr.execute(f'SELECT MIN(id), MAX(id) FROM "{self.env[model_name]._table}"')
+        min_id, max_id = self.env.cr.fetchone()
+        if min_id is not None:
+            first_start = max(checkpoints.mapped('shard_end'), default=min_id)
+            checkpoints |= self.create([
+                {'job': job, 'shard_start': start, 'shard_end': start + shard_size}
+                for start in range(first_start, max_id + 1, shard_size)
+            ])
+        return checkpoints.filtered(lambda checkpoint: checkpoint.state != 'done')
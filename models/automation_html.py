@@ -0,0 +1,44 @@
+from functools import lru_cache
+
+from markupsafe import Markup
+
+from odoo import fields
+from odoo.tools import html_sanitize
+
+
+class SanitizedMarkup(Markup):
+    """HTML built from a pre-sanitized automation template.
+
+    Like :class:`Markup`, any plain string combined with it is escaped, so the
+    result stays safe; :class:`TrustedHtml` fields store it without running
+    the sanitizer again.
+    """
+    __slots__ = ()
+
+
+@lru_cache(maxsize=None)
+def _sanitized_template(template):
+    # same options as the note/body Html fields, so the result is what they would store
+    return SanitizedMarkup(html_sanitize(
+        template, silent=True, sanitize_tags=True, sanitize_attributes=True,
+        sanitize_style=True, sanitize_form=True,
+    ))
+
+
+def render_html(template, **values):
+    """Render an automation template (``str.format`` syntax)
+
+    The template is sanitized once per process; at render time the values are
+    only escaped (values that are already ``Markup`` are inserted as is).
+    Placeholders must be in text content, not in attribute values.
+    """
+    return _sanitized_template(template).format(**values)
+
+
+class TrustedHtml(fields.Html):
+    """Html field skipping the sanitizer for :class:`SanitizedMarkup` values"""
+
+    def _convert(self, value, record, validate):
+        if isinstance(value, SanitizedMarkup):
+            return value
+        return super()._convert(value, record, validate)
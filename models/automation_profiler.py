@@ -0,0 +1,77 @@
+import functools
+import json
+import logging
+import threading
+
+from odoo import SUPERUSER_ID, fields, models
+from odoo.tools.profiler import Profiler
+from odoo.tools.speedscope import Speedscope
+
+_logger = logging.getLogger(__name__)
+
+# comma separated ids of the users whose automation calls are profiled
+PROFILE_USERS_PARAM = f"{__name__.split('.')[2]}.profile_user_ids"
+
+_local = threading.local()
+
+
+def _profiling_enabled(env):
+    if env.context.get('automation_profile'):
+        return True
+    user_ids = env['ir.config_parameter'].sudo().get_param(PROFILE_USERS_PARAM)
+    return bool(user_ids) and str(env.uid) in user_ids.replace(' ', '').split(',')
+
+
+def profiled(label):
+    """Profile the decorated automation entry point on demand
+
+    Profiling is enabled per call with the ``automation_profile`` context key
+    or per user with the ``<module>.profile_user_ids`` system parameter. The
+    SQL and Python profile of the outermost profiled call is stored as a
+    speedscope JSON attachment readable by administrators only: it holds every
+    query, including the ones run as superuser. Its description references the
+    first record (the first created one for ``create``). When disabled, the
+    cost is one (cached) parameter lookup.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if getattr(_local, 'active', False) or not _profiling_enabled(self.env):
+                return method(self, *args, **kwargs)
+            _local.active = True
+            try:
+                with Profiler(collectors=['sql', 'traces_async'], db=None, description=label) as profiler:
+                    result = method(self, *args, **kwargs)
+            finally:
+                _local.active = False
+            # create() is called on an empty model: reference the records it made
+            records = self if self or not isinstance(result, models.BaseModel) else result
+            _store_profile(records, label, profiler)
+            return result
+        return wrapper
+    return decorator
+
+
+def _store_profile(records, label, profiler):
+    try:
+        speedscope = Speedscope(name=label, init_stack_trace=profiler.init_stack_trace)
+        queries = 0
+        for collector in profiler.collectors:
+            if collector.entries:
+                speedscope.add(collector.name, collector.entries)
+            if collector.name == 'sql':
+                queries = len(collector.entries)
+        data = json.dumps(speedscope.add_default().make())
+        timestamp = fields.Datetime.now().strftime('%Y%m%d-%H%M%S')
+        record = f"{records._name},{records[:1].id}" if records else records._name
+        # no res_id and created by the superuser: only administrators can read it
+        records.env['ir.attachment'].with_user(SUPERUSER_ID).create({
+            'name': f"profile-{label}-{timestamp}.speedscope.json",
+            'raw': data.encode(),
+            'mimetype': 'application/json',
+            'description': f"{label} on {record} as uid {records.env.uid}: "
+                           f"{profiler.duration:.3f}s, {queries} queries",
+        })
+    except Exception:
+        # profiling must never break the automation itself
+        _logger.exception("Could not store the profile of %s", label)
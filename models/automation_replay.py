@@ -0,0 +1,128 @@
+import json
+import logging
+import time
+from collections import defaultdict
+
+from odoo import models, api, fields
+
+_logger = logging.getLogger(__name__)
+
+
+class AutomationReplay(models.AbstractModel):
+    """Replay recorded lead events through the automation rules.
+
+    Events are dicts (one JSON object per line in the exported JSONL file),
+    for example::
+
+        {"type": "stage_change", "lead_id": 42, "stage": "Won"}
+        {"type": "installation_progress", "lead_id": 42, "value": "system_testing"}
+        {"type": "calendar_booking", "lead_id": 42, "name": "Installation", "start": "2026-05-04 08:00:00", "stop": "2026-05-04 12:00:00"}
+        {"type": "order_confirmation", "order_id": 17}
+        {"type": "lead_write", "lead_id": 42, "vals": {"x_fully_qualified": true}}
+
+    Nothing here commits: the caller is expected to roll the transaction
+    back once the report is built (the ``automation_replay`` command does).
+    """
+    _name = 'automation.replay'
+    _description = 'Automation Replay Engine'
+
+    @api.model
+    def _read_events(self, path):
+        with open(path, encoding='utf-8') as events_file:
+            for line in events_file:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+    @api.model
+    def _replay_events(self, events, with_details=False):
+        """Run every event through the automation and return a report dict"""
+        cr = self.env.cr
+        self = self.with_context(mail_notify_force_send=False)
+        activity_start = self._max_id('mail_activity')
+        message_start = self._max_id('mail_message')
+        stats = defaultdict(lambda: {'count': 0, 'errors': 0, 'seconds': 0.0, 'queries': 0, 'activities': 0, 'messages': 0})
+        total_seconds = 0.0
+        total = 0
+        for event in events:
+            event_type = event.get('type', 'unknown')
+            handler = getattr(self, f'_replay_{event_type}', None)
+            stat = stats[event_type]
+            stat['count'] += 1
+            total += 1
+            if handler is None:
+                stat['errors'] += 1
+                continue
+            activity_mark = self._max_id('mail_activity')
+            message_mark = self._max_id('mail_message')
+            queries = cr.sql_log_count
+            started = time.perf_counter()
+            try:
+                with cr.savepoint():
+                    handler(event)
+                    self.env.flush_all()
+            except Exception as e:
+                _logger.info("Replay of %s event failed: %s", event_type, e)
+                stat['errors'] += 1
+            elapsed = time.perf_counter() - started
+            stat['seconds'] += elapsed
+            stat['queries'] += cr.sql_log_count - queries
+            stat['activities'] += self._count_since('mail_activity', activity_mark)
+            stat['messages'] += self._count_since('mail_message', message_mark)
+            total_seconds += elapsed
+
+        report = {
+            'events': total,
+            'seconds': round(total_seconds, 3),
+            'events_per_second': round(total / total_seconds, 1) if total_seconds else 0.0,
+            'by_type': {
+                event_type: dict(stat, seconds=round(stat['seconds'], 3),
+                                 queries_per_event=round(stat['queries'] / stat['count'], 1))
+                for event_type, stat in stats.items()
+            },
+        }
+        if with_details:
+            report['activities'] = self.env['mail.activity'].search_read(
+                [('id', '>', activity_start)], ['res_model', 'res_id', 'summary', 'date_deadline'])
+            report['messages'] = self.env['mail.message'].search_read(
+                [('id', '>', message_start)], ['model', 'res_id', 'subject', 'message_type'])
+        return report
+
+    def _max_id(self, table):
+        self.env.cr.execute(f'SELECT COALESCE(MAX(id), 0) FROM "{table}"')
+        return self.env.cr.fetchone()[0]
+
+    def _count_since(self, table, mark):
+        self.env.cr.execute(f'SELECT COUNT(*) FROM "{table}" WHERE id > %s', [mark])
+        return self.env.cr.fetchone()[0]
+
+    # Event handlers, one per recorded event type
+
+    def _replay_stage_change(self, event):
+        lead = self.env['crm.lead'].browse(event['lead_id'])
+        stage_id = event.get('stage_id')
+        if not stage_id:
+            stage_id = self.env['crm.stage'].search([('name', '=', event['stage'])], limit=1).id
+        lead.write({'stage_id': stage_id})
+
+    def _replay_installation_progress(self, event):
+        self.env['crm.lead'].browse(event['lead_id']).write({'x_installation_progress': event['value']})
+
+    def _replay_calendar_booking(self, event):
+        lead = self.env['crm.lead'].browse(event['lead_id'])
+        self.env['calendar.event'].create({
+            'name': event.get('name') or f'Installation - {lead.name}',
+            'start': fields.Datetime.to_datetime(event['start']),
+            'stop': fields.Datetime.to_datetime(event['stop']),
+            'opportunity_id': lead.id,
+        })
+
+    def _replay_order_confirmation(self, event):
+        order = self.env['sale.order'].browse(event['order_id'])
+        if order.state in ('draft', 'sent'):
+            order.action_confirm()
+        else:
+            order.write({'state': 'sale'})
+
+    def _replay_lead_write(self, event):
+        self.env['crm.lead'].browse(event['lead_id']).write(event['vals'])
@@ -0,0 +1,282 @@
+import logging
+import os
+import tempfile
+import threading
+from collections import namedtuple
+from functools import lru_cache
+
+from odoo import models, api
+from odoo.http import Stream
+from odoo.tools import config
+
+from .sale_order_hooks import MODULE
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import boto3
+except ImportError:
+    boto3 = None
+    _logger.debug("boto3 is not installed, installation photos stay in the filestore")
+
+# ``store_fname`` of attachments whose content lives in the object store
+EXTERNAL_PREFIX = 'external:'
+CACHE_SIZE_DEFAULT_MB = 1024
+
+ExternalStorage = namedtuple('ExternalStorage', 'endpoint bucket access_key secret_key region prefix')
+
+
+@lru_cache(maxsize=8)
+def _s3_client(endpoint, access_key, secret_key, region):
+    # clients are thread safe and costly to build, share one per configuration
+    return boto3.client(
+        's3',
+        endpoint_url=endpoint or None,
+        aws_access_key_id=access_key or None,
+        aws_secret_access_key=secret_key or None,
+        region_name=region or None,
+    )
+
+
+def _client(storage):
+    return _s3_client(storage.endpoint, storage.access_key, storage.secret_key, storage.region)
+
+
+def _delete_object(storage, key):
+    try:
+        _client(storage).delete_object(Bucket=storage.bucket, Key=key)
+    except Exception:
+        _logger.warning("Could not delete %s from the object store", key, exc_info=True)
+
+
+class IrAttachment(models.Model):
+    """Attachments whose content is offloaded to an S3 compatible object store.
+
+    Their ``store_fname`` is ``external:`` followed by the full object key,
+    ``<prefix><database uuid>/<filestore name>``: reads never depend on the
+    current settings or database name, and objects stay content addressed
+    like the filestore. Only the database whose uuid is in a key deletes that
+    object, so a duplicated database sharing the bucket cannot remove the
+    objects of the original. Reads go through a bounded local cache
+    directory, least recently used files are evicted first.
+
+    The store is configured with ``<module>.external_storage_*`` system
+    parameters (endpoint, bucket, access_key, secret_key, region, prefix);
+    any S3 compatible server works, e.g. MinIO with its endpoint URL.
+    """
+    _inherit = 'ir.attachment'
+
+    @api.model
+    def _external_storage(self):
+        """The object store settings, or None if it is not usable"""
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        bucket = get_param(f'{MODULE}.external_storage_bucket')
+        if not bucket or boto3 is None:
+            return None
+        return ExternalStorage(
+            endpoint=get_param(f'{MODULE}.external_storage_endpoint'),
+            bucket=bucket,
+            access_key=get_param(f'{MODULE}.external_storage_access_key'),
+            secret_key=get_param(f'{MODULE}.external_storage_secret_key'),
+            region=get_param(f'{MODULE}.external_storage_region'),
+            prefix=get_param(f'{MODULE}.external_storage_prefix', ''),
+        )
+
+    @api.model
+    def _external_key(self, storage, fname):
+        uuid = self.env['ir.config_parameter'].sudo().get_param('database.uuid')
+        return f'{storage.prefix}{uuid}/{fname}'
+
+    @api.model
+    def _external_owned(self, key):
+        """Whether this database uploaded the object ``key``"""
+        # keys end with <uuid>/<xx>/<checksum>
+        parts = key.rsplit('/', 3)
+        uuid = self.env['ir.config_parameter'].sudo().get_param('database.uuid')
+        return len(parts) >= 3 and parts[-3] == uuid
+
+    @api.model
+    def _external_cache_dir(self):
+        return os.path.join(config['data_dir'], 'external_cache', self.env.cr.dbname)
+
+    @api.model
+    def _external_cache_path(self, fname):
+        """Local path of an offloaded file, fetched from the object store on a cache miss"""
+        key = fname[len(EXTERNAL_PREFIX):]
+        path = os.path.join(self._external_cache_dir(), key)
+        if os.path.exists(path):
+            # the modification time orders the cache for eviction
+            os.utime(path)
+            return path
+        storage = self._external_storage()
+        if storage is None:
+            raise OSError(f"{fname} is offloaded but the object store is not configured")
+        try:
+            data = _client(storage).get_object(Bucket=storage.bucket, Key=key)['Body'].read()
+        except Exception as e:
+            raise OSError(f"Could not fetch {key} from the object store: {e}") from e
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write aside and rename, so other workers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_path, path)
+        self._external_cache_evict(keep=path)
+        return path
+
+    @api.model
+    def _external_cache_evict(self, keep=None):
+        """Remove the least recently used files above the cache size, except ``keep``"""
+        max_size = int(self.env['ir.config_parameter'].sudo().get_param(
+            f'{MODULE}.external_cache_size_mb', CACHE_SIZE_DEFAULT_MB)) * 1024 * 1024
+        entries = []
+        total = 0
+        for dirpath, _dirnames, filenames in os.walk(self._external_cache_dir()):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                total += stat.st_size
+                if path != keep:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        for _mtime, size, path in sorted(entries):
+            if total <= max_size:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+
+    def _file_read(self, fname):
+        if not fname.startswith(EXTERNAL_PREFIX):
+            return super()._file_read(fname)
+        try:
+            with open(self._external_cache_path(fname), 'rb') as external_file:
+                return external_file.read()
+        except OSError:
+            _logger.info("_read_file reading %s", fname, exc_info=True)
+            return b''
+
+    def _file_delete(self, fname):
+        if not fname.startswith(EXTERNAL_PREFIX):
+            return super()._file_delete(fname)
+        # the object is shared by every attachment with the same content
+        self.flush_model(['store_fname'])
+        self.env.cr.execute("SELECT 1 FROM ir_attachment WHERE store_fname = %s LIMIT 1", [fname])
+        if self.env.cr.fetchone():
+            return
+        key = fname[len(EXTERNAL_PREFIX):]
+        try:
+            os.unlink(os.path.join(self._external_cache_dir(), key))
+        except OSError:
+            pass
+        if not self._external_owned(key):
+            # uploaded by another database (this one is a copy): it may still use it
+            return
+        storage = self._external_storage()
+        if storage is not None:
+            # only once the deletion is committed, a rollback keeps the object
+            self.env.cr.postcommit.add(lambda: _delete_object(storage, key))
+
+    @api.model
+    def _external_offload(self, fname):
+        """Upload a filestore file and point all its attachments to the object store
+
+        The local file is left to the filestore garbage collector.
+        """
+        storage = self._external_storage()
+        key = self._external_key(storage, fname)
+        with open(self._full_path(fname), 'rb') as local_file:
+            _client(storage).put_object(Bucket=storage.bucket, Key=key, Body=local_file)
+        self.flush_model(['store_fname'])
+        self.env.cr.execute(
+            "UPDATE ir_attachment SET store_fname = %s WHERE store_fname = %s",
+            [EXTERNAL_PREFIX + key, fname])
+        self.invalidate_model(['store_fname'])
+        self._mark_for_gc(fname)
+
+    def _external_stream(self):
+        self.ensure_one()
+        path = self._external_cache_path(self.store_fname)
+        return Stream(
+            type='path',
+            path=path,
+            mimetype=self.mimetype,
+            download_name=self.name,
+            conditional=True,
+            etag=self.checksum,
+            last_modified=self.write_date,
+            size=os.stat(path).st_size,
+            public=self.public,
+        )
+
+
+class IrBinary(models.AbstractModel):
+    _inherit = 'ir.binary'
+
+    def _record_to_stream(self, record, field_name):
+        if record._name == 'ir.attachment' and field_name in ('raw', 'datas', 'db_datas'):
+            attachment = record
+        elif record._name == 'installation.photo' and field_name == 'image':
+            record.check_field_access_rights('read', [field_name])
+            attachment = self.env['ir.attachment'].sudo().search([
+                ('res_model', '=', record._name),
+                ('res_id', '=', record.id),
+                ('res_field', '=', field_name),
+            ], limit=1)
+        else:
+            return super()._record_to_stream(record, field_name)
+        if attachment and (attachment.store_fname or '').startswith(EXTERNAL_PREFIX):
+            return attachment._external_stream()
+        return super()._record_to_stream(record, field_name)
+
+
+class InstallationPhoto(models.Model):
+    _inherit = 'installation.photo'
+
+    @api.model
+    def _cron_offload_photos(self, batch_size=100):
+        """Offload the original photos of completed projects to the object store
+
+        The chatter copies share the files and move with them; thumbnails
+        stay local. Commits after each batch.
+        """
+        Attachment = self.env['ir.attachment']
+        if Attachment._external_storage() is None:
+            return
+        stage = self.env['crm.stage'].search([('name', '=', 'Complete')], limit=1)
+        if not stage:
+            return
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        cr = self.env.cr
+        failed = []
+        while True:
+            self.env.flush_all()
+            cr.execute("""
+                SELECT DISTINCT attachment.store_fname
+                  FROM ir_attachment attachment
+                  JOIN installation_photo photo ON photo.id = attachment.res_id
+                  JOIN crm_lead lead ON lead.id = photo.lead_id
+                 WHERE attachment.res_model = 'installation.photo'
+                   AND attachment.res_field = 'image'
+                   AND attachment.store_fname IS NOT NULL
+                   AND attachment.store_fname NOT LIKE %s
+                   AND attachment.store_fname != ALL(%s)
+                   AND lead.stage_id = %s
+                 LIMIT %s
+            """, [EXTERNAL_PREFIX + '%', failed, stage.id, batch_size])
+            fnames = [fname for fname, in cr.fetchall()]
+            if not fnames:
+                break
+            for fname in fnames:
+                try:
+                    with cr.savepoint():
+                        Attachment._external_offload(fname)
+                except Exception:
+                    _logger.warning("Could not offload %s", fname, exc_info=True)
+                    failed.append(fname)
+            if auto_commit:
+                cr.commit()
@@ -0,0 +1,173 @@
+from datetime import timedelta
+
+from odoo import models, api, fields
+
+from .sale_order_hooks import (
+    BRES_BUILD_LEAD_DAYS, INSTALLATION_DURATION, PICKING_WINDOW_DAYS, add_working_days,
+)
+
+
+def _build_day(install_day):
+    """Working day on which the BRES boxes of an installation are due"""
+    day = install_day - timedelta(days=BRES_BUILD_LEAD_DAYS)
+    # builds due on a weekend are pulled back to the Friday
+    return day - timedelta(days=max(day.weekday() - 4, 0))
+
+
+class InstallationCapacityDay(models.Model):
+    """Installation load of one working day.
+
+    Rows are a cache: they are recomputed for a whole horizon with a single
+    grouped query when one of its days is missing or flagged ``dirty``. Changes
+    to installation meetings, confirmed orders and crews flag the days they
+    affect (from their ``write`` overrides), so reading an unchanged horizon costs nothing.
+    """
+    _name = 'installation.capacity.day'
+    _description = 'Installation Capacity per Day'
+    _order = 'date'
+    _log_access = False
+
+    date = fields.Date(required=True, readonly=True)
+    installation_count = fields.Integer(string='Installations', readonly=True)
+    ordered_qty = fields.Float(string='Ordered Quantity', digits='Product Unit of Measure', readonly=True,
+                               help="Quantity on the confirmed sale orders of the day's installations")
+    box_build_count = fields.Integer(string='BRES Box Builds', readonly=True,
+                                     help="Installations whose BRES boxes must be built on this day")
+    crew_capacity = fields.Integer(string='Crew Capacity', readonly=True,
+                                   help="Installations the active crews can do in a day")
+    over_capacity = fields.Boolean(string='Over Capacity', readonly=True)
+    dirty = fields.Boolean(default=True, readonly=True)
+
+    _sql_constraints = [
+        ('date_uniq', 'unique(date)', 'There is only one capacity line per day.'),
+    ]
+
+    @api.model
+    def _planner_tz(self):
+        return self.env.company.partner_id.tz or 'UTC'
+
+    @api.model
+    def _horizon_days(self, date_from, working_days):
+        last_day = add_working_days(date_from, working_days)
+        days = []
+        day = date_from
+        while day <= last_day:
+            if day.weekday() < 5:
+                days.append(day)
+            day += timedelta(days=1)
+        return days
+
+    @api.model
+    def _get_horizon(self, date_from=None, working_days=PICKING_WINDOW_DAYS):
+        """Capacity lines of the working days from ``date_from`` over ``working_days`` working days"""
+        date_from = date_from or fields.Date.context_today(self)
+        days = self._horizon_days(date_from, working_days)
+        lines = self.search([('date', 'in', days)])
+        if len(lines) < len(days) or any(lines.mapped('dirty')):
+            # the lines are a shared cache, any user reading them may refresh it
+            self.sudo()._refresh_days(days)
+            lines = self.search([('date', 'in', days)])
+        return lines
+
+    @api.model
+    def _refresh_days(self, days):
+        """Recompute the lines of ``days`` (sorted working days) with one grouped query"""
+        cr = self.env.cr
+        self.env.flush_all()
+        cr.execute("""
+            INSERT INTO installation_capacity_day (date, dirty)
+                 SELECT UNNEST(%s::date[]), true
+            ON CONFLICT (date) DO NOTHING
+        """, [days])
+        first_day, last_day = days[0], days[-1]
+        # installations up to this day can still have builds due in the horizon
+        last_install_day = last_day + timedelta(days=BRES_BUILD_LEAD_DAYS + 3)
+        cr.execute("""
+            WITH installs AS (
+                SELECT lead.id AS lead_id,
+                       (event.start AT TIME ZONE 'UTC' AT TIME ZONE %(tz)s)::date AS day
+                  FROM crm_lead lead
+                  JOIN calendar_event event ON event.id = lead.x_installation_meeting_id
+                 WHERE lead.active AND event.active
+                   AND event.start >= %(utc_from)s AND event.start < %(utc_to)s
+            ), quantities AS (
+                SELECT so.opportunity_id AS lead_id, SUM(line.product_uom_qty) AS qty
+                  FROM sale_order so
+                  JOIN sale_order_line line ON line.order_id = so.id
+                 WHERE so.state IN ('sale', 'done')
+                   AND line.display_type IS NULL
+                   AND so.opportunity_id IN (SELECT lead_id FROM installs)
+              GROUP BY so.opportunity_id
+            ), loads AS (
+                SELECT installs.day, 1 AS installations, COALESCE(quantities.qty, 0) AS qty, 0 AS builds
+                  FROM installs
+             LEFT JOIN quantities ON quantities.lead_id = installs.lead_id
+             UNION ALL
+                SELECT installs.day - %(build_days)s
+                       - GREATEST(EXTRACT(ISODOW FROM installs.day - %(build_days)s)::int - 5, 0),
+                       0, 0, 1
+                  FROM installs
+            )
+            SELECT day, SUM(installations), SUM(qty), SUM(builds)
+              FROM loads
+             WHERE day BETWEEN %(first_day)s AND %(last_day)s
+          GROUP BY day
+        """, {
+            'tz': self._planner_tz(),
+            'utc_from': first_day - timedelta(days=1),
+            'utc_to': last_install_day + timedelta(days=2),
+            'build_days': BRES_BUILD_LEAD_DAYS,
+            'first_day': first_day,
+            'last_day': last_day,
+        })
+        loads = {day: rest for day, *rest in cr.fetchall()}
+        capacity = self._crew_capacity()
+        for line in self.search([('date', 'in', days)]):
+            installations, qty, builds = loads.get(line.date, (0, 0.0, 0))
+            line.write({
+                'installation_count': installations,
+                'ordered_qty': qty,
+                'box_build_count': builds,
+                'crew_capacity': capacity,
+                'over_capacity': installations > capacity,
+                'dirty': False,
+            })
+
+    @api.model
+    def _crew_capacity(self):
+        return sum(
+            int((crew.work_end - crew.work_start) // INSTALLATION_DURATION)
+            for crew in self.env['installation.crew'].search([])
+        )
+
+    @api.model
+    def _mark_dirty(self, starts):
+        """Flag the days affected by installations starting at ``starts`` (UTC datetimes)"""
+        days = set()
+        for start in filter(None, starts):
+            # the planner's timezone can move the installation to the day before or after
+            for offset in (-1, 0, 1):
+                day = start.date() + timedelta(days=offset)
+                days.update((day, _build_day(day)))
+        if days:
+            self.env.cr.execute(
+                "UPDATE installation_capacity_day SET dirty = true WHERE date = ANY(%s) AND NOT dirty",
+                [list(days)])
+            self.invalidate_model(['dirty'])
+
+    @api.model
+    def _mark_all_dirty(self):
+        self.env.cr.execute("UPDATE installation_capacity_day SET dirty = true WHERE NOT dirty")
+        self.invalidate_model(['dirty'])
+
+    @api.model
+    def action_open_planner(self):
+        """Refresh the upcoming two picking windows and open them"""
+        lines = self._get_horizon(working_days=2 * PICKING_WINDOW_DAYS)
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Installation Capacity',
+            'res_model': self._name,
+            'view_mode': 'tree',
+            'domain': [('id', 'in', lines.ids)],
+        }
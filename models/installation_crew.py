@@ -0,0 +1,192 @@
+import logging
+from datetime import datetime, time, timedelta
+
+import psycopg2
+import pytz
+
+from odoo import models, api, fields, _
+from odoo.exceptions import ValidationError
+from odoo.tools import ormcache
+from odoo.tools.sql import constraint_definition
+
+from .sale_order_hooks import add_working_days
+
+_logger = logging.getLogger(__name__)
+
+CREW_EXCLUSION = 'calendar_event_x_crew_period_excl'
+
+
+class InstallationCrew(models.Model):
+    _name = 'installation.crew'
+    _description = 'Installation Crew'
+    _order = 'name'
+
+    name = fields.Char(required=True)
+    active = fields.Boolean(default=True)
+    user_ids = fields.Many2many('res.users', string='Members')
+    work_start = fields.Float(string='Work Day Start', default=8.0, help="Local time, in hours")
+    work_end = fields.Float(string='Work Day End', default=18.0, help="Local time, in hours")
+
+    # crews set the capacity of every installation day
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        crews = super().create(vals_list)
+        self.env['installation.capacity.day']._mark_all_dirty()
+        return crews
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {'active', 'work_start', 'work_end'} & set(vals):
+            self.env['installation.capacity.day']._mark_all_dirty()
+        return res
+
+    def unlink(self):
+        self.env['installation.capacity.day']._mark_all_dirty()
+        return super().unlink()
+
+
+class CalendarEvent(models.Model):
+    """Crew bookings on installation events.
+
+    ``x_crew_period`` is a generated ``tstzrange`` column (not an ORM field)
+    covering [start, stop) of events booked for a crew, with a GiST index, so
+    overlap checks and free slot lookups are index range scans.
+    """
+    _inherit = 'calendar.event'
+
+    x_crew_id = fields.Many2one('installation.crew', string='Installation Crew', ondelete='restrict')
+
+    def init(self):
+        cr = self.env.cr
+        cr.execute("""
+            ALTER TABLE calendar_event
+            ADD COLUMN IF NOT EXISTS x_crew_period tstzrange GENERATED ALWAYS AS (
+                CASE WHEN x_crew_id IS NOT NULL AND start <= stop
+                     THEN tstzrange(start AT TIME ZONE 'UTC', stop AT TIME ZONE 'UTC', '[)')
+                END
+            ) STORED
+        """)
+        # with btree_gist the database enforces the bookings itself, with an
+        # exclusion constraint whose index also serves the lookups; the extension
+        # may not be installable by the database user, the range index alone
+        # still serves the lookups and _check_crew_availability serializes
+        try:
+            with cr.savepoint():
+                cr.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+            columns = 'x_crew_id, x_crew_period'
+        except psycopg2.Error:
+            _logger.info("btree_gist is not available, indexing crew periods without the crew")
+            columns = 'x_crew_period'
+        if columns != 'x_crew_period' and not constraint_definition(cr, self._table, CREW_EXCLUSION):
+            try:
+                with cr.savepoint():
+                    # deferred, so the constraint below reports conflicts with a readable
+                    # message first and the database only catches concurrent bookings
+                    cr.execute(f"""
+                        ALTER TABLE calendar_event ADD CONSTRAINT {CREW_EXCLUSION}
+                        EXCLUDE USING gist (x_crew_id WITH =, x_crew_period WITH &&)
+                          WHERE (active AND x_crew_period IS NOT NULL)
+                        DEFERRABLE INITIALLY DEFERRED
+                    """)
+            except psycopg2.Error:
+                _logger.warning("Crews are double-booked, resolve the overlaps and update the module "
+                                "to enforce bookings in the database")
+        cr.execute(f"""
+            CREATE INDEX IF NOT EXISTS calendar_event_x_crew_period_index
+                ON calendar_event USING gist ({columns})
+             WHERE x_crew_period IS NOT NULL AND active
+        """)
+
+    @api.model
+    def _get_crew_bookings(self, crew, start, stop, exclude_ids=()):
+        """Active events of ``crew`` overlapping [start, stop), as (id, name, start, stop) tuples"""
+        self.flush_model(['x_crew_id', 'start', 'stop', 'active'])
+        self.env.cr.execute("""
+            SELECT id, name, start, stop
+              FROM calendar_event
+             WHERE x_crew_id = %s
+               AND active
+               AND x_crew_period && tstzrange(%s AT TIME ZONE 'UTC', %s AT TIME ZONE 'UTC', '[)')
+               AND id != ALL(%s)
+          ORDER BY start
+        """, [crew.id, start, stop, list(exclude_ids)])
+        return self.env.cr.fetchall()
+
+    def _get_crew_conflicts(self):
+        self.ensure_one()
+        if not (self.x_crew_id and self.active and self.start and self.stop):
+            return []
+        exclude_ids = [self._origin.id] if self._origin.id else []
+        return self._get_crew_bookings(self.x_crew_id, self.start, self.stop, exclude_ids)
+
+    @api.model
+    @ormcache()
+    def _crew_exclusion_enforced(self):
+        return bool(constraint_definition(self.env.cr, self._table, CREW_EXCLUSION))
+
+    @api.constrains('x_crew_id', 'start', 'stop', 'active')
+    def _check_crew_availability(self):
+        crews = self.filtered('active').x_crew_id
+        if crews and not self._crew_exclusion_enforced():
+            # without the exclusion constraint, two transactions could both pass the
+            # check below: touching the crew rows makes the second one wait for the
+            # first and fail to serialize (the request is then retried)
+            self.env.cr.execute(
+                "UPDATE installation_crew SET active = active WHERE id IN %s", [tuple(crews.ids)])
+        for event in self:
+            conflicts = event._get_crew_conflicts()
+            if conflicts:
+                raise ValidationError(_(
+                    "%(crew)s is already booked at that time: %(events)s",
+                    crew=event.x_crew_id.name,
+                    events=', '.join(name for _id, name, _start, _stop in conflicts),
+                ))
+
+    @api.onchange('x_crew_id', 'start', 'stop')
+    def _onchange_crew_availability(self):
+        conflicts = self._get_crew_conflicts()
+        if conflicts:
+            return {'warning': {
+                'title': _("Crew already booked"),
+                'message': _(
+                    "%(crew)s is already booked at that time: %(events)s",
+                    crew=self.x_crew_id.name,
+                    events=', '.join(name for _id, name, _start, _stop in conflicts),
+                ),
+            }}
+
+    @api.model
+    def _find_next_free_slot(self, crew, duration_hours, working_days=10, date_from=None):
+        """Start (naive UTC) of the first free slot of ``duration_hours`` in the crew's working hours
+
+        Searches from ``date_from`` (default: now) through the next
+        ``working_days`` working days, with a single indexed query for the
+        bookings of the whole window. Returns None if the crew is fully booked.
+        """
+        tz = pytz.timezone(self.env.user.tz or 'UTC')
+        now = date_from or fields.Datetime.now()
+        duration = timedelta(hours=duration_hours)
+        first_day = pytz.utc.localize(now).astimezone(tz).date()
+        last_day = add_working_days(first_day, working_days)
+
+        def to_utc(day, hours):
+            local = tz.localize(datetime.combine(day, time()) + timedelta(hours=hours))
+            return local.astimezone(pytz.utc).replace(tzinfo=None)
+
+        bookings = self._get_crew_bookings(crew, to_utc(first_day, 0), to_utc(last_day + timedelta(days=1), 0))
+        day = first_day
+        while day <= last_day:
+            if day.weekday() < 5:
+                cursor = max(to_utc(day, crew.work_start), now)
+                day_end = to_utc(day, crew.work_end)
+                for _id, _name, start, stop in bookings:
+                    if stop <= cursor or start >= day_end:
+                        continue
+                    if start - cursor >= duration:
+                        return cursor
+                    cursor = max(cursor, stop)
+                if day_end - cursor >= duration:
+                    return cursor
+            day += timedelta(days=1)
+        return None
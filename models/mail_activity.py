@@ -0,0 +1,59 @@
+from odoo import models, fields
+
+from .automation_html import TrustedHtml
+
+
+class MailActivity(models.Model):
+    _inherit = 'mail.activity'
+
+    # automation notes are rendered from pre-sanitized templates
+    note = TrustedHtml('Note', sanitize_style=True)
+    x_checklist_template_id = fields.Many2one('automation.checklist.template', string='Checklist', ondelete='set null')
+    x_automation_stage_id = fields.Many2one(
+        'crm.stage', string='Automation Stage', index=True, ondelete='set null',
+        help="Stage the opportunity was in when the automation created this activity; "
+             "the activity is closed once the opportunity moves past that stage")
+
+    def _get_checklist_lead(self):
+        self.ensure_one()
+        if self.res_model != 'crm.lead' or not self.res_id:
+            return self.env['crm.lead']
+        return self.env['crm.lead'].browse(self.res_id)
+
+    def get_checklist_data(self):
+        """Return the checklist items of the activity with their tick state, for the checklist widget"""
+        self.ensure_one()
+        template = self.x_checklist_template_id
+        lead = self._get_checklist_lead()
+        if not template or not lead:
+            return []
+        done_item_ids = set(self.env['automation.checklist.state'].search([
+            ('lead_id', '=', lead.id),
+            ('template_id', '=', template.id),
+        ]).item_id.ids)
+        return [{
+            'id': item.id,
+            'name': item.name,
+            'display_type': item.display_type or 'item',
+            'done': item.id in done_item_ids,
+        } for item in template.item_ids]
+
+    def action_toggle_checklist_item(self, item_id):
+        """Tick or untick a checklist item; returns the new state"""
+        self.ensure_one()
+        lead = self._get_checklist_lead()
+        item = self.env['automation.checklist.template.item'].browse(item_id)
+        if not lead or item.template_id != self.x_checklist_template_id or item.display_type:
+            return False
+        State = self.env['automation.checklist.state']
+        state = State.search([('lead_id', '=', lead.id), ('item_id', '=', item.id)], limit=1)
+        if state:
+            state.unlink()
+            return False
+        State.create({
+            'lead_id': lead.id,
+            'template_id': item.template_id.id,
+            'item_id': item.id,
+            'activity_id': self.id,
+        })
+        return True
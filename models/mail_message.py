@@ -0,0 +1,10 @@
+from odoo import models
+
+from .automation_html import TrustedHtml
+
+
+class MailMessage(models.Model):
+    _inherit = 'mail.message'
+
+    # automation messages are rendered from pre-sanitized templates
+    body = TrustedHtml('Contents', default='', sanitize_style=True)
@@ -1,15 +1,53 @@
 from odoo import models, api
 
+from .automation_profiler import profiled
+
 class SaleOrder(models.Model):
     _inherit = 'sale.order'
 
     @api.model
+    @profiled('sale.order.write')
     def write(self, vals):
+        # confirmed orders count in the capacity of their installation day
+        capacity_tracked = 'state' in vals or 'opportunity_id' in vals
+        if capacity_tracked:
+            capacity_starts = self.opportunity_id.x_installation_meeting_id.mapped('start')
         res = super(SaleOrder, self).write(vals)
+        if capacity_tracked:
+            capacity_starts += self.opportunity_id.x_installation_meeting_id.mapped('start')
+            self.env['installation.capacity.day']._mark_dirty(capacity_starts)
 
         # Check if state changed to 'sale' (i.e. signed)
         if 'state' in vals and vals['state'] == 'sale':
             for order in self:
                 if order.opportunity_id and order.opportunity_id.probability < 100:
-                    order.opportunity_id.action_set_won()
+                    order.opportunity_id.with_context(stage_transition_source='sale_order').action_set_won()
         return res
+
+
+class SaleOrderLine(models.Model):
+    _inherit = 'sale.order.line'
+
+    def _mark_capacity_dirty(self):
+        orders = self.order_id.filtered(lambda order: order.state in ('sale', 'done'))
+        self.env['installation.capacity.day']._mark_dirty(
+            orders.opportunity_id.x_installation_meeting_id.mapped('start'))
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        lines._mark_capacity_dirty()
+        return lines
+
+    def write(self, vals):
+        tracked = 'product_uom_qty' in vals or 'order_id' in vals or 'display_type' in vals
+        if tracked:
+            self._mark_capacity_dirty()
+        res = super().write(vals)
+        if tracked:
+            self._mark_capacity_dirty()
+        return res
+
+    def unlink(self):
+        self._mark_capacity_dirty()
+        return super().unlink()
@@ -1,5 +1,29 @@
-from odoo import models, api, fields
+from markupsafe import Markup
+from psycopg2 import OperationalError
+
+from odoo import models, api, fields, _
+from odoo.service.model import PG_CONCURRENCY_ERRORS_TO_RETRY
+from odoo.tools import split_every
+from odoo.tools.sql import column_exists, create_column, table_exists
+from .automation_html import render_html
+from .automation_profiler import profiled
 from datetime import timedelta
+import threading
+import time
+
+# technical name of this addon, used to resolve our own xml ids
+MODULE = __name__.split('.')[2]
+
+# seconds to wait before retrying leads that were locked by other transactions
+PICKING_RETRY_BACKOFF = 2
+PICKING_RETRY_BACKOFF_MAX = 30
+
+# leads are moved to Picking this many working days before their installation
+PICKING_WINDOW_DAYS = 5
+# default length of an installation meeting, in hours
+INSTALLATION_DURATION = 4.0
+# BRES boxes are built this many days before the installation
+BRES_BUILD_LEAD_DAYS = 7
 
 class CrmLead(models.Model):
     _inherit = 'crm.lead'
@@ -8,75 +32,80 @@ class CrmLead(models.Model):
     x_site_visit_event_id = fields.Many2one('calendar.event', string='Site Visit Appointment')
     x_fully_qualified = fields.Boolean(string="Fully Qualified", help="Tick to confirm lead is qualified and ready for quotation")
     x_installation_photo_ids = fields.One2many('installation.photo', 'lead_id', string="Installation Photos")
+    x_installation_photo_count = fields.Integer(
+        compute='_compute_installation_photo_count', string="Photo Count",
+        help="Number of installation photos; the gallery widget pages through them on demand")
     x_installation_meeting_id = fields.Many2one(
         'calendar.event', string='Installation Appointment',
         help="Schedule the installation meeting")
-
+    x_installation_crew_id = fields.Many2one(
+        'installation.crew', string='Installation Crew',
+        help="Crew doing the installation; used to propose a free slot when scheduling")
+    x_checklist_state_ids = fields.One2many('automation.checklist.state', 'lead_id', string="Checklist Progress")
+    x_automation_pending = fields.Boolean(
+        string="Automation Pending", copy=False, index=True,
+        help="Created without inline automation (e.g. by an import); activities are created by a background job")
+
+    @profiled('crm.lead.write')
     def write(self, vals):
+        previous_stages = {lead.id: lead.stage_id.id for lead in self} if 'stage_id' in vals else {}
+        # installation days whose capacity changes with the meeting or the lead
+        capacity_tracked = 'x_installation_meeting_id' in vals or 'active' in vals
+        if capacity_tracked:
+            capacity_starts = self.x_installation_meeting_id.mapped('start')
         res = super().write(vals)
+        if capacity_tracked:
+            capacity_starts += self.x_installation_meeting_id.mapped('start')
+            self.env['installation.capacity.day']._mark_dirty(capacity_starts)
         
         # Check for stage changes and create appropriate activities
         if 'stage_id' in vals:
+            self.env['crm.lead.stage.transition']._record(
+                self, previous_stages, self.env.context.get('stage_transition_source', 'manual'))
+            self._close_superseded_activities()
             self._create_stage_based_activity(vals['stage_id'])
             # If moved manually to Picking, trigger picking preparation activity
             stage = self.env['crm.stage'].browse(vals['stage_id'])
             if stage.name == 'Picking':
                 for lead in self:
-                    order = self.env['sale.order'].search([
-                        ('opportunity_id', '=', lead.id),
-                        ('state', '=', 'sale'),
-                    ], limit=1)
-                    if order:
-                        order_link = f"/web#id={order.id}&model=sale.order&view_type=form"
-                        order_name = order.name
-                    else:
-                        order_link = ''
-                        order_name = 'Customer Order'
-                    note = (
-                        f"<h4>🧰 ORDER PREPARATION</h4>"
-                        f"<b>Customer Order:</b> <a href='{order_link}' target='_blank'>{order_name}</a><br/>"
-                        "□ Gather all equipment items as per customer order<br/>"
-                        "□ Begin building BRES boxes and other pre-install assemblies<br/>"
-                    )
                     lead._safe_create_activity(
                         '🧰 Prepare for Picking',
-                        note,
+                        lead._get_order_preparation_note(),
                         'mail.mail_activity_data_todo',
-                        days_ahead=0
+                        days_ahead=0,
+                        checklist='checklist_order_preparation'
                     )
             # If moved manually to Permits, trigger permits gathering activity
             stage = self.env['crm.stage'].browse(vals['stage_id'])
             if stage.name == 'Permits':
                 for lead in self:
-                    note = (
+                    note = render_html(
                         "<h4>✉️ GATHER & SEND PERMITS & CONTRACTS</h4>"
-                        f"<b>Project:</b> {lead.name}<br/>"
-                        "□ Gather all required permits and contracts<br/>"
-                        "□ Review and finalize any missing signatures or data<br/>"
-                        "□ Send all permits and contracts to appropriate authorities on behalf of the customer<br/>"
+                        "<b>Project:</b> {name}<br/>",
+                        name=lead.name,
                     )
                     lead._safe_create_activity(
                         '✉️ Gather & Send Permits & Contracts',
                         note,
                         'mail.mail_activity_data_todo',
-                        days_ahead=0
+                        days_ahead=0,
+                        checklist='checklist_permits_contracts'
                     )
             # If moved manually to Commissioned, trigger final invoice activity
             stage = self.env['crm.stage'].browse(vals['stage_id'])
             if stage.name == 'Commissioned':
                 for lead in self:
-                    note = (
+                    note = render_html(
                         "<h4>📃 FINAL INVOICE</h4>"
-                        f"<b>Project:</b> {lead.name}<br/>"
-                        "□ Generate final invoice for the customer<br/>"
-                        "□ Review invoice details and totals<br/>"
-                        "□ Send invoice to customer and log the dispatch<br/>"
+                        "<b>Project:</b> {name}<br/>",
+                        name=lead.name,
                     )
                     lead._safe_create_activity(
                         '📃 Send Final Invoice',
                         note,
                         'mail.mail_activity_data_todo',
-                        days_ahead=0
+                        days_ahead=0,
+                        checklist='checklist_final_invoice'
                     )
         
         # Auto-progress stages based on field updates
@@ -84,311 +113,184 @@ class CrmLead(models.Model):
             
         return res
 
-    @api.model
-    def create(self, vals):
-        """Create initial activity when new opportunity is created"""
-        lead = super().create(vals)
+    @api.model_create_multi
+    @profiled('crm.lead.create')
+    def create(self, vals_list):
+        """Create initial activity when new opportunities are created
+
+        Imports (or callers passing ``defer_lead_automation``) skip the inline
+        automation: the leads are flagged and the activities are created in
+        bulk by ``_cron_process_pending_automation``.
+        """
+        defer = self.env.context.get('import_file') or self.env.context.get('defer_lead_automation')
+        if defer:
+            vals_list = [dict(vals, x_automation_pending=True) for vals in vals_list]
+        leads = super().create(vals_list)
+        self.env['crm.lead.stage.transition']._record(
+            leads, {}, self.env.context.get('stage_transition_source') or ('import' if self.env.context.get('import_file') else 'create'))
+
+        if defer:
+            self.env.ref(f'{MODULE}.ir_cron_process_pending_automation')._trigger()
+            return leads
 
         # Create initial activity for new leads
-        if lead.stage_id.name in ['New', 'Lead']:
-            lead._create_stage_based_activity(lead.stage_id.id)
+        for lead in leads:
+            if lead.stage_id.name in ['New', 'Lead']:
+                lead._create_stage_based_activity(lead.stage_id.id)
         
-        return lead
+        return leads
+
+    def _compute_installation_photo_count(self):
+        groups = self.env['installation.photo'].read_group(
+            [('lead_id', 'in', self.ids)], ['lead_id'], ['lead_id'], lazy=False)
+        counts = {group['lead_id'][0]: group['__count'] for group in groups}
+        for lead in self:
+            lead.x_installation_photo_count = counts.get(lead.id, 0)
 
     def _create_stage_based_activity(self, stage_id):
         """Create appropriate activity based on current stage"""
         stage = self.env['crm.stage'].browse(stage_id)
+        config = self._get_stage_activity_config(stage)
+        if config:
+            self._safe_create_activity(
+                config['title'],
+                config['note'],
+                config['type'],
+                days_ahead=config['days'],
+                checklist=config['checklist']
+            )
+
+    def _get_stage_activity_config(self, stage):
+        """Return the activity to create for ``stage`` (title, note, days, type, checklist), if any"""
         activity_configs = {
             'New': {
                 'title': '📞 First Contact – Qualification Script',
-                'note': f"""
-<h3>📞 FIRST CONTACT – {self.name}</h3>
-
-<b>Customer:</b> {self.partner_id.name if self.partner_id else self.contact_name or 'Contact details needed'}<br/>
-<b>Phone:</b> {self.phone or 'Phone number needed'}<br/>
-<b>Email:</b> {self.email_from or 'Email needed'}<br/>
-<b>Address:</b> {self._get_full_address() or 'Address needed'}<br/>
-
-<h4>QUALIFICATION CHECKLIST:</h4>
-□ Confirm customer goals and timeline<br/>
-□ Discuss current electricity usage and costs<br/>
-□ Identify decision-makers and budget expectations<br/>
-□ Explain site visit and assessment process<br/>
-□ Schedule site visit using the “Schedule Site Visit” button on this page<br/>
-□ Record any relevant notes in the CRM<br/>
-
-<h4>OPTIONAL QUESTIONS TO DEEPEN QUALIFICATION:</h4>
-□ Property ownership (own vs rent)<br/>
-□ Roof condition and age<br/>
-□ Current monthly electricity cost<br/>
-□ Interest level and timeline<br/>
-□ Budget considerations<br/>
-□ Decision-making process<br/>
-□ Will they be home during the site visit?<br/>
-□ Any special access or roof concerns?<br/>
-
-<h4>NEXT STEP:</h4>
-Schedule site visit and move to 'Qualified' stage
+                'note': """
+<h3>📞 FIRST CONTACT – {name}</h3>
+
+<b>Customer:</b> {contact}<br/>
+<b>Phone:</b> {phone}<br/>
+<b>Email:</b> {email}<br/>
+<b>Address:</b> {address}<br/>
   """,
                 'days': 0,
-                'type': 'mail.mail_activity_data_call'
+                'type': 'mail.mail_activity_data_call',
+                'checklist': 'checklist_first_contact',
             },
             
             'Qualified': {
                 'title': '🏠 Conduct Site Visit & Create Quotation',
-                'note': f"""
-<h3>🔍 SITE VISIT & ASSESSMENT - {self.name}</h3>
-
-<b>Customer:</b> {self.partner_id.name if self.partner_id else self.contact_name}<br/>
-<b>Site Visit:</b> {self.x_site_visit_event_id.name if hasattr(self, 'x_site_visit_event_id') and self.x_site_visit_event_id else 'Schedule appointment'}<br/>
-
-<h4>SITE VISIT CHECKLIST:</h4>
-□ Arrive on time and introduce yourself professionally<br/>
-□ Assess roof condition, size, and orientation<br/>
-□ Check electrical panel and available space<br/>
-□ Measure roof dimensions and note obstacles<br/>
-□ <b>Take photos of roof, electrical panel, and site</b><br/>
-<i>Upload photos in the <b>Photos & Documentation</b> tab below. Use the image uploader to add multiple images and view thumbnails directly.</i><br/>
-□ Discuss energy usage and electricity bills<br/>
-□ Explain solar system design options<br/>
-□ Answer customer questions and concerns<br/>
-
-<h4>TECHNICAL ASSESSMENT:</h4>
-□ Roof material and structural integrity<br/>
-□ Shading analysis (trees, buildings, etc.)<br/>
-□ Electrical system compatibility<br/>
-□ Available roof space for panels<br/>
-□ Grid connection requirements<br/>
-□ Permit requirements for area<br/>
-
-<h4>POST-VISIT TASKS:</h4>
-□ Update customer record with site visit notes<br/>
-□ Design preliminary solar system layout<br/>
-□ Calculate system size and production estimates<br/>
-□ Prepare detailed quotation with options<br/>
-□ Include financial analysis and payback period<br/>
-□ Schedule quotation presentation<br/>
-
-<h4>NEXT STEP:</h4>
-Create and send quotation, move to 'Proposition' stage
+                'note': """
+<h3>🔍 SITE VISIT & ASSESSMENT - {name}</h3>
+
+<b>Customer:</b> {customer}<br/>
+<b>Site Visit:</b> {site_visit}<br/>
                 """,
                 'days': 1,
-                'type': 'mail.mail_activity_data_meeting'
+                'type': 'mail.mail_activity_data_meeting',
+                'checklist': 'checklist_site_visit',
             },
             
             'Proposition': {
                 'title': '💰 Quotation Follow-up & Customer Support',
-                'note': f"""
-<h3>📋 QUOTATION FOLLOW-UP - {self.name}</h3>
-
-<b>Customer:</b> {self.partner_id.name if self.partner_id else self.contact_name}<br/>
-<b>Quotation Sent:</b> {fields.Date.today().strftime('%Y-%m-%d')}<br/>
-
-<h4>FOLLOW-UP CHECKLIST:</h4>
-□ Confirm customer received quotation (call within 24h)<br/>
-□ Schedule presentation call/meeting to review quotation<br/>
-□ Answer any questions about system design<br/>
-□ Explain financing options and incentives<br/>
-□ Address concerns about installation process<br/>
-□ Provide references from satisfied customers<br/>
-□ Clarify warranty and maintenance terms<br/>
-
-<h4>COMMON QUESTIONS TO PREPARE FOR:</h4>
-□ How long will installation take?<br/>
-□ What happens during bad weather?<br/>
-□ Will system work during power outages?<br/>
-□ Maintenance requirements and costs<br/>
-□ Warranty coverage details<br/>
-□ Permit and inspection process<br/>
-□ Property value impact<br/>
-
-<h4>SALES SUPPORT:</h4>
-□ Calculate return on investment<br/>
-□ Compare with competitors if needed<br/>
-□ Explain company credentials and experience<br/>
-□ Provide financing assistance if needed<br/>
-□ Offer system monitoring demonstration<br/>
-□ Schedule second opinion visit if requested<br/>
-
-<h4>FOLLOW-UP SCHEDULE:</h4>
-• Day 1: Confirm receipt<br/>
-• Day 3: Presentation call<br/>
-• Day 7: Check-in call<br/>
-• Day 14: Final follow-up<br/>
-
-<h4>NEXT STEP:</h4>
-Close sale and move to 'Won' stage when customer signs
+                'note': """
+<h3>📋 QUOTATION FOLLOW-UP - {name}</h3>
+
+<b>Customer:</b> {customer}<br/>
+<b>Quotation Sent:</b> {today}<br/>
                 """,
                 'days': 1,
-                'type': 'mail.mail_activity_data_call'
+                'type': 'mail.mail_activity_data_call',
+                'checklist': 'checklist_quotation_follow_up',
             },
             
             'Won': {
                 'title': '📋 Stock Assessment & Procurement Planning',
-                'note': f"""
-<h3>📋 STOCK ASSESSMENT & PROCUREMENT - {self.name}</h3>
-
-<b>Customer:</b> {self.partner_id.name if self.partner_id else self.contact_name}<br/>
-<b>Sale Amount:</b> {self.expected_revenue or 'Update amount'}<br/>
-
-<h4>STOCK AVAILABILITY CHECK:</h4>
-□ Review all equipment requirements from quotation<br/>
-□ Check current stock levels for each item<br/>
-□ Identify items that need to be ordered<br/>
-□ Confirm vendor availability and lead times<br/>
-□ Calculate total procurement timeline<br/>
-
-<h4>PROCUREMENT ACTIONS:</h4>
-□ Create purchase orders for out-of-stock items<br/>
-□ Follow up with suppliers on delivery dates<br/>
-□ Arrange equipment storage if needed<br/>
-□ Update procurement timeline based on vendor responses<br/>
-
-<h4>CUSTOMER COMMUNICATION:</h4>
-□ Email customer with project timeline update<br/>
-□ Explain equipment ordering process and lead times<br/>
-□ Provide realistic installation date estimates<br/>
-□ Set expectations for next communication milestone<br/>
-□ Send welcome packet with company information<br/>
-
-<h4>PROJECT SETUP:</h4>
-□ Assign project manager and installation team<br/>
-□ Create customer project file<br/>
-□ Begin permit application preparation<br/>
-□ Schedule internal project kickoff meeting<br/>
-
-<h4>TIMELINE COMMUNICATION TEMPLATE:</h4>
-<i>"Thank you for choosing us for your solar installation! We're now ordering your equipment and preparing permits. Based on current supplier lead times, we expect to begin installation in [X] weeks. We'll keep you updated weekly on our progress."</i><br/>
-
-<b>NOTE:</b> If all equipment is in stock, project will automatically move to "Ready to go" stage for installation scheduling.
+                'note': """
+<h3>📋 STOCK ASSESSMENT & PROCUREMENT - {name}</h3>
+
+<b>Customer:</b> {customer}<br/>
+<b>Sale Amount:</b> {amount}<br/>
                 """,
                 'days': 0,
-                'type': 'mail.mail_activity_data_todo'
+                'type': 'mail.mail_activity_data_todo',
+                'checklist': 'checklist_procurement_planning',
             },
             
             'Ordered': {
                 'title': '📦 Track Equipment Procurement & Delivery',
-                'note': f"""
-<h3>📦 PROCUREMENT TRACKING - {self.name}</h3>
+                'note': """
+<h3>📦 PROCUREMENT TRACKING - {name}</h3>
 
-<b>Customer:</b> {self.partner_id.name if self.partner_id else self.contact_name}<br/>
+<b>Customer:</b> {customer}<br/>
 <b>Status:</b> Equipment procurement in progress<br/>
-
-<h4>PROCUREMENT MONITORING:</h4>
-□ Review purchase order status for all suppliers<br/>
-□ Follow up on delivery dates and lead times<br/>
-□ Track shipment progress and expected arrivals<br/>
-□ Coordinate with suppliers on any delays<br/>
-□ Update customer on procurement timeline<br/>
-
-<h4>INVENTORY MANAGEMENT:</h4>
-□ Process receipts when equipment arrives<br/>
-□ Inspect equipment quality and completeness<br/>
-□ Update inventory system with received goods<br/>
-□ Arrange equipment storage and handling<br/>
-□ Verify all items against original order<br/>
-
-<h4>DELIVERY COORDINATION:</h4>
-□ Monitor delivery order status in system<br/>
-□ Coordinate equipment delivery to installation site<br/>
-□ Confirm site access and delivery logistics<br/>
-□ Schedule equipment delivery timing<br/>
-
-<h4>CUSTOMER COMMUNICATION:</h4>
-□ Provide weekly procurement status updates<br/>
-□ Notify customer of any delivery delays<br/>
-□ Confirm installation timeline based on equipment arrival<br/>
-□ Prepare customer for next phase (installation scheduling)<br/>
-
-<h4>SYSTEM INTEGRATION:</h4>
-<i>The system automatically tracks:</i><br/>
-• Purchase order receipts and inventory updates<br/>
-• Delivery order fulfillment capability<br/>
-• Stock reservation status for your order<br/>
-• Auto-progression to "Ready to go" when equipment complete<br/>
-
-<h4>NEXT STEP:</h4>
-System will automatically move to "Ready to go" when all equipment is available for delivery
                 """,
                 'days': 2,
-                'type': 'mail.mail_activity_data_todo'
+                'type': 'mail.mail_activity_data_todo',
+                'checklist': 'checklist_procurement_tracking',
             },
             
             'Ready to go': {
                 'title': '📅 Installation Scheduling & Team Coordination',
-                'note': f"""
-<h3>📅 SCHEDULE INSTALLATION - {self.name}</h3>
+                'note': """
+<h3>📅 SCHEDULE INSTALLATION - {name}</h3>
 
-<b>Customer:</b> {self.partner_id.name if self.partner_id else self.contact_name}<br/>
+<b>Customer:</b> {customer}<br/>
 <b>Status:</b> All equipment ready for installation<br/>
-
-<h4>CUSTOMER SCHEDULING:</h4>
-□ Call customer to schedule installation dates<br/>
-□ Offer 2-3 available installation windows<br/>
-□ Confirm customer availability during installation<br/>
-□ Discuss any site preparation requirements<br/>
-□ Confirm access arrangements (keys, parking, etc.)<br/>
-□ Send installation confirmation email with dates<br/>
-
-<h4>INSTALLATION TEAM COORDINATION:</h4>
-□ Assign installation crew and team leader<br/>
-□ Confirm team availability for scheduled dates<br/>
-□ Brief team on site-specific requirements<br/>
-□ Prepare installation drawings and documentation<br/>
-□ Ensure all tools and safety equipment ready<br/>
-□ Plan equipment delivery to site<br/>
-
-<h4>PRE-INSTALLATION CHECKLIST:</h4>
-□ Verify permits are approved and available<br/>
-□ Check weather forecast for installation period<br/>
-□ Confirm electrical panel accessibility<br/>
-□ Arrange equipment delivery timing<br/>
-□ Prepare customer communication materials<br/>
-□ Schedule any required inspections<br/>
-
-<h4>INSTALLATION LOGISTICS:</h4>
-□ Confirm site access and parking arrangements<br/>
-□ Notify neighbors if appropriate<br/>
-□ Plan backup dates for weather delays<br/>
-□ Prepare installation timeline for customer<br/>
-□ Set up daily progress communication plan<br/>
-
-<h4>CUSTOMER COMMUNICATION:</h4>
-□ Provide installation team contact information<br/>
-□ Explain installation process and timeline<br/>
-□ Set expectations for daily progress updates<br/>
-□ Confirm any customer responsibilities<br/>
-
-<h4>NEXT STEP:</h4>
-Create installation meeting in calendar and move to 'Scheduling' stage
                 """,
                 'days': 1,
-                'type': 'mail.mail_activity_data_call'
+                'type': 'mail.mail_activity_data_call',
+                'checklist': 'checklist_installation_scheduling',
             },
             'Commissioned': {
                 'title': '📃 Send Final Invoice',
-                'note': f"""
-<h4>📃 FINAL INVOICE - {self.name}</h4>
-□ Generate final invoice for the customer<br/>
-□ Review invoice details and totals<br/>
-□ Send invoice to customer and log the dispatch<br/>
+                'note': """
+<h4>📃 FINAL INVOICE - {name}</h4>
 """,
                 'days': 0,
-                'type': 'mail.mail_activity_data_todo'
+                'type': 'mail.mail_activity_data_todo',
+                'checklist': 'checklist_final_invoice',
             }
         }
         
-        if stage.name in activity_configs:
-            config = activity_configs[stage.name]
-            self._safe_create_activity(
-                config['title'],
-                config['note'],
-                config['type'],
-                days_ahead=config['days']
-            )
+        config = activity_configs.get(stage.name)
+        if not config:
+            return None
+        customer = self.partner_id.name if self.partner_id else self.contact_name
+        note = render_html(
+            config['note'],
+            name=self.name,
+            customer=customer,
+            contact=self.partner_id.name if self.partner_id else self.contact_name or 'Contact details needed',
+            phone=self.phone or 'Phone number needed',
+            email=self.email_from or 'Email needed',
+            address=self._get_full_address() or 'Address needed' if stage.name == 'New' else '',
+            site_visit=self.x_site_visit_event_id.name if hasattr(self, 'x_site_visit_event_id') and self.x_site_visit_event_id else 'Schedule appointment',
+            today=fields.Date.today().strftime('%Y-%m-%d'),
+            amount=self.expected_revenue or 'Update amount',
+        )
+        return dict(config, note=note)
 
     # _create_intro_call_activity method removed
 
+    def _get_order_preparation_note(self):
+        """Note of the picking preparation activity, linking to the confirmed customer order"""
+        order = self.env['sale.order'].search([
+            ('opportunity_id', '=', self.id),
+            ('state', '=', 'sale'),
+        ], limit=1)
+        if order:
+            order_link = f"/web#id={order.id}&model=sale.order&view_type=form"
+            order_name = order.name
+        else:
+            order_link = ''
+            order_name = 'Customer Order'
+        return render_html(
+            "<h4>🧰 ORDER PREPARATION</h4>"
+            "<b>Customer Order:</b> {order}<br/>",
+            order=Markup("<a href='{}' target='_blank'>{}</a>").format(order_link, order_name),
+        )
+
     def _get_full_address(self):
         """Get formatted full address"""
         address_parts = []
@@ -429,23 +331,38 @@ Create installation meeting in calendar and move to 'Scheduling' stage
         }
 
     def action_schedule_installation(self):
-        """Action to schedule the installation meeting"""
+        """Action to schedule the installation meeting
+
+        With a crew assigned, the form opens on the crew's next free slot.
+        """
+        context = {
+            'default_name': f'Installation - {self.name}',
+            'default_description': f'Installation for {self.partner_id.name or self.contact_name}',
+            'default_duration': INSTALLATION_DURATION,
+            'default_opportunity_id': self.id,
+            'default_partner_ids': [(6, 0, [self.partner_id.id] if self.partner_id else [])],
+        }
+        crew = self.x_installation_crew_id
+        if crew:
+            context['default_x_crew_id'] = crew.id
+            slot = self.env['calendar.event']._find_next_free_slot(crew, INSTALLATION_DURATION)
+            if slot:
+                context['default_start'] = fields.Datetime.to_string(slot)
+                context['default_stop'] = fields.Datetime.to_string(slot + timedelta(hours=INSTALLATION_DURATION))
         return {
             'type': 'ir.actions.act_window',
             'name': 'Schedule Installation',
             'res_model': 'calendar.event',
             'view_mode': 'form',
             'target': 'new',
-            'context': {
-                'default_name': f'Installation - {self.name}',
-                'default_description': f'Installation for {self.partner_id.name or self.contact_name}',
-                'default_duration': 4.0,
-                'default_opportunity_id': self.id,
-                'default_partner_ids': [(6, 0, [self.partner_id.id] if self.partner_id else [])],
-            },
+            'context': context,
             'on_close': {'type': 'ir.actions.client', 'tag': 'reload'},
         }
 
+    def _set_stage(self, stage, source):
+        """Move to ``stage``, recording ``source`` in the stage transition history"""
+        self.with_context(stage_transition_source=source).write({'stage_id': stage.id})
+
     def _check_stage_progression(self, vals):
         """Check if stage should progress based on field updates"""
         
@@ -454,10 +371,10 @@ Create installation meeting in calendar and move to 'Scheduling' stage
             if self.stage_id.name == 'New':
                 qualified_stage = self.env['crm.stage'].search([('name', '=', 'Qualified')], limit=1)
                 if qualified_stage:
-                    self.stage_id = qualified_stage.id
+                    self._set_stage(qualified_stage, 'automation')
                     self._create_stage_based_activity(qualified_stage.id)
                     self.message_post(
-                        body="📅 <b>Site Visit Scheduled</b><br/>Moving to Qualified stage for site assessment.",
+                        body=render_html("📅 <b>Site Visit Scheduled</b><br/>Moving to Qualified stage for site assessment."),
                         subject="Site Visit Scheduled"
                     )
         
@@ -466,10 +383,10 @@ Create installation meeting in calendar and move to 'Scheduling' stage
             if self.stage_id.name == 'New':
                 qualified_stage = self.env['crm.stage'].search([('name', '=', 'Qualified')], limit=1)
                 if qualified_stage:
-                    self.stage_id = qualified_stage.id
+                    self._set_stage(qualified_stage, 'automation')
                     self._create_stage_based_activity(qualified_stage.id)
                     self.message_post(
-                        body="✅ <b>Lead Fully Qualified</b><br/>Moved to Qualified stage based on manual confirmation.",
+                        body=render_html("✅ <b>Lead Fully Qualified</b><br/>Moved to Qualified stage based on manual confirmation."),
                         subject="Lead Qualified"
                     )
         
@@ -495,7 +412,7 @@ Create installation meeting in calendar and move to 'Scheduling' stage
         if self.stage_id.name in ['Ordered', 'Ready to go']:
             stage = self.env['crm.stage'].search([('name', '=', 'Scheduling')], limit=1)
             if stage:
-                self.stage_id = stage.id
+                self._set_stage(stage, 'automation')
                 
                 # Update installation progress
                 try:
@@ -508,52 +425,39 @@ Create installation meeting in calendar and move to 'Scheduling' stage
                 self._create_installation_preparation_activity()
                 
                 self.message_post(
-                    body="📅 <b>Installation Scheduled</b><br/>Installation meeting created. Moving to scheduling phase.",
+                    body=render_html("📅 <b>Installation Scheduled</b><br/>Installation meeting created. Moving to scheduling phase."),
                     subject="Installation Meeting Scheduled"
                 )
 
     def _auto_progress_by_installation_status(self, progress_value):
         """Auto-progress stage based on installation progress value"""
-        
-        stage_mappings = {
-            'equipment_delivered': ('Ready to go', "Equipment has been delivered and is ready for installation."),
-            'installation_in_progress': ('Installing', "Installation work has begun on site."),
-            'electrical_complete': ('Installing', "Electrical work completed, continuing installation phase."),
-            'system_testing': ('Installing', "System testing in progress."),
-            'utility_inspection': ('Permits', "System ready for utility inspection."),
-            'interconnection_approved': ('Permits', "Utility interconnection approved."),
-            'system_commissioned': ('Commissioned', "System has been commissioned and is operational."),
-            'project_complete': ('Complete', "Project completed successfully.")
-        }
-        
-        if progress_value in stage_mappings:
-            target_stage_name, message = stage_mappings[progress_value]
+        if progress_value in INSTALLATION_PROGRESS_STAGES:
+            target_stage_name, message = INSTALLATION_PROGRESS_STAGES[progress_value]
             stage = self.env['crm.stage'].search([('name', '=', target_stage_name)], limit=1)
             
             if stage and self.stage_id.name != target_stage_name:
-                self.stage_id = stage.id
+                self._set_stage(stage, 'automation')
                 
                 # Create appropriate follow-up activities
                 self._create_progress_based_activity(progress_value)
                 
                 self.message_post(
-                    body=f"⚡ <b>Progress Update</b><br/>{message}",
+                    body=render_html("⚡ <b>Progress Update</b><br/>{message}", message=message),
                     subject=f"Installation Progress: {progress_value.replace('_', ' ').title()}"
                 )
                 # Automatic invoice activity when commissioning completes
                 if progress_value == 'system_commissioned':
-                    note = (
+                    note = render_html(
                         "<h4>📃 FINAL INVOICE</h4>"
-                        f"<b>Project:</b> {self.name}<br/>"
-                        "□ Generate final invoice for the customer<br/>"
-                        "□ Review invoice details and totals<br/>"
-                        "□ Send invoice to customer and log the dispatch<br/>"
+                        "<b>Project:</b> {name}<br/>",
+                        name=self.name,
                     )
                     self._safe_create_activity(
                         '📃 Send Final Invoice',
                         note,
                         'mail.mail_activity_data_todo',
-                        days_ahead=0
+                        days_ahead=0,
+                        checklist='checklist_final_invoice'
                     )
 
     def _auto_progress_to_permits(self):
@@ -561,7 +465,7 @@ Create installation meeting in calendar and move to 'Scheduling' stage
         if self.stage_id.name == 'Installing':
             stage = self.env['crm.stage'].search([('name', '=', 'Permits')], limit=1)
             if stage:
-                self.stage_id = stage.id
+                self._set_stage(stage, 'automation')
                 
                 # Update installation progress
                 try:
@@ -575,17 +479,18 @@ Create installation meeting in calendar and move to 'Scheduling' stage
                 # Create action to gather & send permits and contracts
                 self._safe_create_activity(
                     '✉️ Gather & Send Permits & Contracts',
-                    f"<h4>✉️ GATHER & SEND PERMITS & CONTRACTS</h4>"
-                    f"<b>Project:</b> {self.name}<br/>"
-                    "□ Gather all required permits and contracts<br/>"
-                    "□ Review and finalize any missing signatures or data<br/>"
-                    "□ Send all permits and contracts to appropriate authorities on behalf of the customer<br/>",
+                    render_html(
+                        "<h4>✉️ GATHER & SEND PERMITS & CONTRACTS</h4>"
+                        "<b>Project:</b> {name}<br/>",
+                        name=self.name,
+                    ),
                     'mail.mail_activity_data_todo',
-                    days_ahead=0
+                    days_ahead=0,
+                    checklist='checklist_permits_contracts'
                 )
                 
                 self.message_post(
-                    body="📋 <b>Permits Submitted</b><br/>Installation permits have been submitted for approval.",
+                    body=render_html("📋 <b>Permits Submitted</b><br/>Installation permits have been submitted for approval."),
                     subject="Permits Submitted for Approval"
                 )
 
@@ -598,7 +503,7 @@ Create installation meeting in calendar and move to 'Scheduling' stage
             if has_signoff_date and has_customer_signature and self.stage_id.name == 'Commissioned':
                 stage = self.env['crm.stage'].search([('name', '=', 'Complete')], limit=1)
                 if stage:
-                    self.stage_id = stage.id
+                    self._set_stage(stage, 'automation')
                     
                     # Update installation progress
                     try:
@@ -611,7 +516,7 @@ Create installation meeting in calendar and move to 'Scheduling' stage
                     self._create_project_completion_activity()
                     
                     self.message_post(
-                        body="🎉 <b>Project Completed!</b><br/>Customer has signed off and project is officially complete.",
+                        body=render_html("🎉 <b>Project Completed!</b><br/>Customer has signed off and project is officially complete."),
                         subject="Solar Installation Project Complete"
                     )
         except Exception as e:
@@ -622,29 +527,25 @@ Create installation meeting in calendar and move to 'Scheduling' stage
 
     def _create_installation_preparation_activity(self):
         """Create activity for installation preparation"""
-        activity_note = f"""
+        activity_note = render_html(
+            """
 <h3>🔧 INSTALLATION PREPARATION CHECKLIST</h3>
 
-<b>Project:</b> {self.name}<br/>
-<b>Customer:</b> {self.partner_id.name if self.partner_id else 'N/A'}<br/>
-
-<h4>PRE-INSTALLATION TASKS:</h4>
-□ Confirm equipment delivery to site<br/>
-□ Verify installation team availability<br/>
-□ Check weather forecast for installation dates<br/>
-□ Confirm site access and parking arrangements<br/>
-□ Review safety requirements and protocols<br/>
-□ Prepare installation documentation<br/>
-□ Contact customer 24h before installation<br/>
-
-<b>Installation Meeting:</b> {self.x_installation_meeting_id.name if hasattr(self, 'x_installation_meeting_id') and self.x_installation_meeting_id else 'Scheduled'}
-        """
+<b>Project:</b> {name}<br/>
+<b>Customer:</b> {customer}<br/>
+<b>Installation Meeting:</b> {meeting}
+        """,
+            name=self.name,
+            customer=self.partner_id.name if self.partner_id else 'N/A',
+            meeting=self.x_installation_meeting_id.name if hasattr(self, 'x_installation_meeting_id') and self.x_installation_meeting_id else 'Scheduled',
+        )
         
         self._safe_create_activity(
             '🔧 Installation Preparation Checklist',
             activity_note,
             'mail.mail_activity_data_todo',
-            days_ahead=1
+            days_ahead=1,
+            checklist='checklist_installation_preparation'
         )
         # reminder one week ahead of the installation meeting
         if self.x_installation_meeting_id and self.x_installation_meeting_id.start:
@@ -653,14 +554,16 @@ Create installation meeting in calendar and move to 'Scheduling' stage
             if isinstance(install_dt, str):
                 install_dt = fields.Datetime.from_string(install_dt)
             from datetime import timedelta as _timedelta
-            reminder_date = (install_dt - _timedelta(days=7)).date()
+            reminder_date = (install_dt - _timedelta(days=BRES_BUILD_LEAD_DAYS)).date()
             days_until_reminder = (reminder_date - fields.Date.today()).days
             if days_until_reminder > 0:
                 self._safe_create_activity(
                     '🔔 Installation Scheduling Reminder',
-                    '<h4>Prepare for installation:</h4>□ Contact customer to arrange installation based on weather and timing<br/>□ Begin building BRES boxes and other pre-install tasks',
+                    render_html('<h4>Prepare for installation:</h4>□ Contact customer to arrange installation based on weather and timing<br/>□ Begin building BRES boxes and other pre-install tasks'),
                     'mail.mail_activity_data_todo',
-                    days_ahead=days_until_reminder
+                    days_ahead=days_until_reminder,
+                    # due the day the lead reaches Picking: it must outlive this stage
+                    close_on_stage_change=False,
                 )
 
     def _create_progress_based_activity(self, progress_value):
@@ -669,54 +572,21 @@ Create installation meeting in calendar and move to 'Scheduling' stage
         activity_configs = {
             'installation_in_progress': {
                 'title': '⚡ Monitor Installation Progress',
-                'note': f"""
-Installation started for {self.name}
-
-DAILY MONITORING TASKS:
-□ Check installation team progress
-□ Monitor safety compliance
-□ Update customer on progress
-□ Document any issues or delays
-□ Take progress photos
-□ Ensure quality standards
-
-Expected completion: Check with installation team
-                """,
-                'days': 0
+                'note': "<h4>⚡ INSTALLATION STARTED - {name}</h4>",
+                'days': 0,
+                'checklist': 'checklist_installation_monitoring',
             },
             'system_testing': {
                 'title': '🔍 System Testing & Quality Check', 
-                'note': f"""
-System testing phase for {self.name}
-
-TESTING CHECKLIST:
-□ Solar panel output verification
-□ Inverter functionality test
-□ Electrical connections check
-□ Safety systems test
-□ Performance monitoring setup
-□ Documentation of test results
-
-Next: Prepare for utility inspection
-                """,
-                'days': 1
+                'note': "<h4>🔍 SYSTEM TESTING - {name}</h4>",
+                'days': 1,
+                'checklist': 'checklist_system_testing',
             },
             'system_commissioned': {
                 'title': '📋 Prepare Customer Handover',
-                'note': f"""
-System commissioned for {self.name} - Prepare handover
-
-HANDOVER PREPARATION:
-□ Prepare system documentation
-□ Create customer operation manual
-□ Schedule customer training session
-□ Prepare warranty information
-□ Set up monitoring access for customer
-□ Prepare final invoice
-
-Schedule customer sign-off meeting
-                """,
-                'days': 2
+                'note': "<h4>📋 SYSTEM COMMISSIONED - {name}</h4>",
+                'days': 2,
+                'checklist': 'checklist_customer_handover',
             }
         }
         
@@ -724,89 +594,45 @@ Schedule customer sign-off meeting
             config = activity_configs[progress_value]
             self._safe_create_activity(
                 config['title'],
-                config['note'],
+                render_html(config['note'], name=self.name),
                 'mail.mail_activity_data_todo',
-                days_ahead=config['days']
+                days_ahead=config['days'],
+                checklist=config['checklist']
             )
 
     def _create_permit_tracking_activity(self):
         """Create activity for permit tracking"""
-        activity_note = f"""
-📋 PERMIT TRACKING - {self.name}
-
-PERMIT STATUS MONITORING:
-□ Confirm permit application received
-□ Track approval status with utility company
-□ Follow up on any additional requirements
-□ Schedule utility inspection when approved
-□ Prepare for interconnection process
-
-TYPICAL TIMELINE:
-• Initial review: 5-10 business days
-• Site inspection: 2-5 business days after approval
-• Final approval: 1-3 business days after inspection
-
-Contact utility company if no response within expected timeframe.
-        """
-        
         self._safe_create_activity(
             '📋 Track Permit Approval Progress',
-            activity_note,
+            render_html("<h4>📋 PERMIT TRACKING - {name}</h4>", name=self.name),
             'mail.mail_activity_data_todo',
-            days_ahead=3
+            days_ahead=3,
+            checklist='checklist_permit_tracking'
         )
 
     def _create_project_completion_activity(self):
         """Create post-completion follow-up activity"""
-        activity_note = f"""
-🎉 POST-COMPLETION FOLLOW-UP - {self.name}
-
-COMPLETION TASKS:
-□ Send completion confirmation to customer
-□ Provide final system documentation
-□ Set up monitoring system access
-□ Schedule 30-day performance check
-□ Create maintenance schedule
-□ Process final invoicing
-□ Request customer review/testimonial
-□ Update CRM records and close project
-
-FOLLOW-UP SCHEDULE:
-• 30 days: Performance check
-• 6 months: System maintenance
-• 12 months: Annual inspection
-        """
-        
         self._safe_create_activity(
             '🎉 Project Completion Follow-up',
-            activity_note,
+            render_html("<h4>🎉 POST-COMPLETION FOLLOW-UP - {name}</h4>", name=self.name),
             'mail.mail_activity_data_todo',
-            days_ahead=1
+            days_ahead=1,
+            checklist='checklist_project_completion'
         )
 
-    def _safe_create_activity(self, summary, note, activity_type_ref, days_ahead=1):
-        """Safely create activity with error handling"""
+    def _safe_create_activity(self, summary, note, activity_type_ref, days_ahead=1, checklist=None,
+                              close_on_stage_change=True):
+        """Safely create activity with error handling
+
+        ``checklist`` is the xml id of an ``automation.checklist.template``; the
+        activity only references it, tick states live in ``automation.checklist.state``.
+        Unless ``close_on_stage_change`` is False, the activity is closed once
+        the lead moves past its current stage.
+        """
+        template = self.env.ref(f'{MODULE}.{checklist}', raise_if_not_found=False) if checklist else None
         try:
-            # Get the model ID for crm.lead
-            model_id = self.env['ir.model'].search([('model', '=', 'crm.lead')], limit=1)
-            
-            # Get activity type - fallback to TODO if specific type not found
-            try:
-                activity_type = self.env.ref(activity_type_ref)
-            except:
-                activity_type = self.env.ref('mail.mail_activity_data_todo')
-            
-            activity_vals = {
-                'res_model': 'crm.lead',
-                'res_model_id': model_id.id,
-                'res_id': self.id,
-                'activity_type_id': activity_type.id,
-                'summary': summary,
-                'note': note,
-                'date_deadline': fields.Date.today() + timedelta(days=days_ahead),
-                'user_id': self.user_id.id or self.env.user.id,
-            }
-            
+            activity_vals = self._prepare_activity_vals(
+                summary, note, activity_type_ref, days_ahead, template, close_on_stage_change)
             self.env['mail.activity'].create(activity_vals)
             
         except Exception as e:
@@ -816,67 +642,298 @@ FOLLOW-UP SCHEDULE:
             _logger.warning(f"Could not create activity: {e}")
             
             # Convert line breaks to HTML for message posting
-            formatted_note = note.replace('\n', '<br/>')
+            formatted_note = str(note).replace('\n', '<br/>')
+            if template:
+                formatted_note += template._render_html()
             
             self.message_post(
                 body=f"<b>{summary}</b><br/>{formatted_note}",
                 subject=summary
             )
 
+    def _prepare_activity_vals(self, summary, note, activity_type_ref, days_ahead=1, template=None,
+                               close_on_stage_change=True):
+        """Values to create an automation activity on this lead"""
+        # Get activity type - fallback to TODO if specific type not found
+        try:
+            activity_type = self.env.ref(activity_type_ref)
+        except:
+            activity_type = self.env.ref('mail.mail_activity_data_todo')
+
+        return {
+            'res_model': 'crm.lead',
+            'res_model_id': self.env['ir.model']._get_id('crm.lead'),
+            'res_id': self.id,
+            'activity_type_id': activity_type.id,
+            'summary': summary,
+            'note': note,
+            'date_deadline': fields.Date.today() + timedelta(days=days_ahead),
+            'user_id': self.user_id.id or self.env.user.id,
+            'x_checklist_template_id': template.id if template else False,
+            'x_automation_stage_id': self.stage_id.id if close_on_stage_change else False,
+        }
+
+    def _close_superseded_activities(self):
+        """Mark automation activities of earlier stages as done, in one batch"""
+        activities = self.env['mail.activity'].search([
+            ('res_model', '=', 'crm.lead'),
+            ('res_id', 'in', self.ids),
+            ('x_automation_stage_id', '!=', False),
+        ])
+        stages = {lead.id: lead.stage_id for lead in self}
+        superseded = activities.filtered(
+            lambda act: stages[act.res_id] and _stage_rank(act.x_automation_stage_id) < _stage_rank(stages[act.res_id])
+        )
+        if superseded:
+            superseded.action_feedback(feedback=_("Closed automatically: the opportunity moved to a later stage."))
+
+    @api.model
+    def _cron_close_superseded_activities(self, batch_size=500):
+        """Close automation activities left open on leads that already moved past their stage"""
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        while True:
+            self.env.cr.execute("""
+                SELECT act.id
+                  FROM mail_activity act
+                  JOIN crm_lead lead ON lead.id = act.res_id
+                  JOIN crm_stage cur ON cur.id = lead.stage_id
+                  JOIN crm_stage old ON old.id = act.x_automation_stage_id
+                 WHERE act.res_model = 'crm.lead'
+                   AND (old.sequence, old.id) < (cur.sequence, cur.id)
+              ORDER BY act.id
+                 LIMIT %s
+            """, [batch_size])
+            activity_ids = [row[0] for row in self.env.cr.fetchall()]
+            if not activity_ids:
+                break
+            self.env['mail.activity'].browse(activity_ids).action_feedback(
+                feedback=_("Closed automatically: the opportunity moved to a later stage."))
+            # done activities are deleted, so the next chunk starts where this one ended
+            if auto_commit:
+                self.env.cr.commit()
 
     @api.model
-    def _cron_move_to_picking(self):
-        """Move leads to 'Picking' if installation is within the next 5 working days (inclusive)."""
+    def _tag_legacy_automation_activities(self):
+        """Link activities created before stages were recorded to the stage that created them
+
+        Run once by the 16.0.1.1.0 migration.
+        """
+        stages = self.env['crm.stage'].search([('name', 'in', list(set(LEGACY_ACTIVITY_STAGES.values())))])
+        stage_ids = {stage.name: stage.id for stage in stages}
+        values = [(summary, stage_ids[name]) for summary, name in LEGACY_ACTIVITY_STAGES.items() if name in stage_ids]
+        for chunk in split_every(100, values, list):
+            self.env.cr.execute("""
+                UPDATE mail_activity act
+                   SET x_automation_stage_id = legacy.stage_id
+                  FROM (VALUES %s) AS legacy(summary, stage_id)
+                 WHERE act.res_model = 'crm.lead'
+                   AND act.x_automation_stage_id IS NULL
+                   AND act.summary = legacy.summary
+            """ % ', '.join(['(%s, %s)'] * len(chunk)), [v for pair in chunk for v in pair])
+        self.env['mail.activity'].invalidate_model(['x_automation_stage_id'])
+
+    @api.model
+    def _cron_process_pending_automation(self, batch_size=1000):
+        """Create the initial activities of leads created with deferred automation, in bulk chunks"""
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        lead_ids = self.search([('x_automation_pending', '=', True)], order='id').ids
+        for ids in split_every(batch_size, lead_ids, list):
+            leads = self.browse(ids)
+            leads.filtered(lambda l: l.stage_id.name in ['New', 'Lead'])._create_stage_based_activities_bulk()
+            leads.write({'x_automation_pending': False})
+            if auto_commit:
+                self.env.cr.commit()
+
+    def _create_stage_based_activities_bulk(self):
+        """Create the stage activity of every lead in ``self`` with a single ``mail.activity`` create"""
+        vals_list = []
+        templates = {}
+        for lead in self:
+            config = lead._get_stage_activity_config(lead.stage_id)
+            if not config:
+                continue
+            if config['checklist'] not in templates:
+                templates[config['checklist']] = self.env.ref(f"{MODULE}.{config['checklist']}", raise_if_not_found=False)
+            vals_list.append(lead._prepare_activity_vals(
+                config['title'], config['note'], config['type'], config['days'], templates[config['checklist']]))
+        try:
+            with self.env.cr.savepoint():
+                self.env['mail.activity'].create(vals_list)
+        except Exception:
+            # one bad lead must not block the others: fall back to the per-lead path
+            for lead in self:
+                lead._create_stage_based_activity(lead.stage_id.id)
+
+    @api.model
+    def _backfill_shard(self, checkpoint, mode='all'):
+        """Re-run the automation for the leads of one ``automation.checkpoint`` shard
+
+        ``stage`` replaces the open stage activity of each lead (checklist tick
+        states are kept, they belong to the lead); ``progress`` re-applies the
+        installation progress rules to leads still before the stage their
+        progress maps to. The caller commits once per shard.
+        """
+        leads = self.search([('id', '>=', checkpoint.shard_start), ('id', '<', checkpoint.shard_end)], order='id')
+        if mode in ('stage', 'all'):
+            titles = {}
+            for lead in leads:
+                config = lead._get_stage_activity_config(lead.stage_id)
+                if config:
+                    titles[lead.id] = (config['title'], lead.stage_id)
+            outdated = self.env['mail.activity'].search([
+                ('res_model', '=', 'crm.lead'),
+                ('res_id', 'in', list(titles)),
+                ('x_automation_stage_id', '!=', False),
+            ]).filtered(lambda act: titles[act.res_id] == (act.summary, act.x_automation_stage_id))
+            # only leads that still had the activity open get it back, done ones stay done
+            lead_ids = set(outdated.mapped('res_id'))
+            outdated.unlink()
+            self.browse(sorted(lead_ids))._create_stage_based_activities_bulk()
+        if mode in ('progress', 'all') and 'x_installation_progress' in self._fields:
+            stages = {}
+            for lead in leads.filtered('x_installation_progress'):
+                target = INSTALLATION_PROGRESS_STAGES.get(lead.x_installation_progress)
+                if not target:
+                    continue
+                if target[0] not in stages:
+                    stages[target[0]] = self.env['crm.stage'].search([('name', '=', target[0])], limit=1)
+                # only move leads forward: a lead moved on by hand past an older
+                # progress value must not be dragged back
+                if stages[target[0]] and _stage_rank(lead.stage_id) < _stage_rank(stages[target[0]]):
+                    lead._auto_progress_by_installation_status(lead.x_installation_progress)
+        checkpoint.write({
+            'state': 'done',
+            'processed': len(leads),
+            'last_id': leads[-1:].id or 0,
+            'message': False,
+        })
+        return len(leads)
+
+    @api.model
+    @profiled('crm.lead._cron_move_to_picking')
+    def _cron_move_to_picking(self, chunk_size=50, max_retries=5):
+        """Move leads to 'Picking' if installation is within the next 5 working days (inclusive).
+
+        Leads are claimed in chunks with ``FOR UPDATE SKIP LOCKED`` and every
+        chunk is committed on its own: a lead that is being edited elsewhere
+        is skipped and retried with backoff instead of blocking (or rolling
+        back) the whole run. Progress is recorded on an ``automation.checkpoint``.
+        """
         today = fields.Date.context_today(self)
-        days = 0
-        check_date = today
-        while days < 5:
-            check_date = check_date + timedelta(days=1)
-            # Weekday: Mon=0 ... Sun=6
-            if check_date.weekday() < 5:
-                days += 1
         window_start = today
-        window_end = check_date + timedelta(days=1)
+        window_end = add_working_days(today, PICKING_WINDOW_DAYS) + timedelta(days=1)
         picking_stage = self.env['crm.stage'].search([('name', '=', 'Picking')], limit=1)
         if not picking_stage:
             return
-        leads = self.search([
+        pending = self.search([
             ('x_installation_meeting_id.start', '>=', window_start),
             ('x_installation_meeting_id.start', '<', window_end),
             ('stage_id', '!=', picking_stage.id),
-        ])
-        for lead in leads:
-            lead.stage_id = picking_stage.id
+        ], order='id').ids
+
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        checkpoint = self.env['automation.checkpoint']._get_checkpoint('move_to_picking')
+        checkpoint.write({'state': 'running', 'processed': 0, 'skipped': 0, 'last_id': 0, 'message': False})
+        if auto_commit:
+            self.env.cr.commit()
+
+        processed = 0
+        for attempt in range(max_retries + 1):
+            if not pending:
+                break
+            if attempt:
+                time.sleep(min(PICKING_RETRY_BACKOFF * 2 ** (attempt - 1), PICKING_RETRY_BACKOFF_MAX))
+            busy = []
+            for chunk in split_every(chunk_size, pending, list):
+                self.env.cr.execute(
+                    "SELECT id, stage_id FROM crm_lead WHERE id IN %s ORDER BY id FOR UPDATE SKIP LOCKED",
+                    [tuple(chunk)])
+                rows = self.env.cr.fetchall()
+                locked = set(chunk) - {lead_id for lead_id, _stage_id in rows}
+                busy += [lead_id for lead_id in chunk if lead_id in locked]
+                claimed = self.browse([lead_id for lead_id, stage_id in rows if stage_id != picking_stage.id])
+                try:
+                    claimed._move_to_picking(picking_stage)
+                    self.env.flush_all()
+                except OperationalError as e:
+                    if e.pgcode not in PG_CONCURRENCY_ERRORS_TO_RETRY or not auto_commit:
+                        raise
+                    # the snapshot is stale after a serialization failure: drop this chunk and retry it later
+                    self.env.cr.rollback()
+                    busy += claimed.ids
+                else:
+                    processed += len(claimed)
+                checkpoint.write({'processed': processed, 'last_id': chunk[-1]})
+                if auto_commit:
+                    self.env.cr.commit()
+            pending = busy
+
+        checkpoint.write({
+            'state': 'failed' if pending else 'done',
+            'skipped': len(pending),
+            'message': f"Still busy after {max_retries} retries: {pending}" if pending else False,
+        })
+
+    def _move_to_picking(self, picking_stage):
+        """Move the leads to Picking; the stage change creates the picking preparation activity"""
+        self._set_stage(picking_stage, 'cron')
+        for lead in self:
             lead.message_post(
                 subject="↔️ Auto‑moved to Picking",
-                body=(
-                    f"Installation is scheduled for {lead.x_installation_meeting_id.start.strftime('%Y-%m-%d') if lead.x_installation_meeting_id and lead.x_installation_meeting_id.start else 'Unknown'}. "
-                    "Automatically moving to <b>Picking</b> stage."
+                body=render_html(
+                    "Installation is scheduled for {date}. "
+                    "Automatically moving to <b>Picking</b> stage.",
+                    date=lead.x_installation_meeting_id.start.strftime('%Y-%m-%d') if lead.x_installation_meeting_id and lead.x_installation_meeting_id.start else 'Unknown',
                 )
             )
-            # Create picking preparation activity linking to the customer order
-            order = self.env['sale.order'].search([
-                ('opportunity_id', '=', lead.id),
-                ('state', '=', 'sale'),
-            ], limit=1)
-            if order:
-                order_link = f"/web#id={order.id}&model=sale.order&view_type=form"
-                order_name = order.name
-            else:
-                order_link = ''
-                order_name = 'Customer Order'
-            note = (
-                f"<h4>🧰 ORDER PREPARATION</h4>"
-                f"<b>Customer Order:</b> <a href='{order_link}' target='_blank'>{order_name}</a><br/>"
-                "□ Gather all equipment items as per customer order<br/>"
-                "□ Begin building BRES boxes and other pre-install assemblies<br/>"
-            )
-            lead._safe_create_activity(
-                '🧰 Prepare for Picking',
-                note,
-                'mail.mail_activity_data_todo',
-                days_ahead=0
-            )
+
+
+def add_working_days(day, count):
+    """Date ``count`` working days (Mon-Fri) after ``day``"""
+    while count > 0:
+        day = day + timedelta(days=1)
+        # Weekday: Mon=0 ... Sun=6
+        if day.weekday() < 5:
+            count -= 1
+    return day
+
+
+# installation progress value -> (stage it moves the lead to, chatter message)
+INSTALLATION_PROGRESS_STAGES = {
+    'equipment_delivered': ('Ready to go', "Equipment has been delivered and is ready for installation."),
+    'installation_in_progress': ('Installing', "Installation work has begun on site."),
+    'electrical_complete': ('Installing', "Electrical work completed, continuing installation phase."),
+    'system_testing': ('Installing', "System testing in progress."),
+    'utility_inspection': ('Permits', "System ready for utility inspection."),
+    'interconnection_approved': ('Permits', "Utility interconnection approved."),
+    'system_commissioned': ('Commissioned', "System has been commissioned and is operational."),
+    'project_complete': ('Complete', "Project completed successfully."),
+}
+
+
+def _stage_rank(stage):
+    """Sort key of a stage, following the ``crm.stage`` ordering"""
+    return (stage.sequence, stage.id)
+
+
+# Summaries of activities created by the automation, with the stage that
+# created them; used to tag activities created before the stage was recorded.
+LEGACY_ACTIVITY_STAGES = {
+    '📞 First Contact – Qualification Script': 'New',
+    '🏠 Conduct Site Visit & Create Quotation': 'Qualified',
+    '💰 Quotation Follow-up & Customer Support': 'Proposition',
+    '📋 Stock Assessment & Procurement Planning': 'Won',
+    '📦 Track Equipment Procurement & Delivery': 'Ordered',
+    '📅 Installation Scheduling & Team Coordination': 'Ready to go',
+    '🔧 Installation Preparation Checklist': 'Scheduling',
+    '🧰 Prepare for Picking': 'Picking',
+    '⚡ Monitor Installation Progress': 'Installing',
+    '🔍 System Testing & Quality Check': 'Installing',
+    '📋 Track Permit Approval Progress': 'Permits',
+    '✉️ Gather & Send Permits & Contracts': 'Permits',
+    '📃 Send Final Invoice': 'Commissioned',
+    '📋 Prepare Customer Handover': 'Commissioned',
+}
 
 
 # Extend Calendar Event to link back to opportunities
@@ -886,6 +943,7 @@ class CalendarEvent(models.Model):
     opportunity_id = fields.Many2one('crm.lead', string='Related Opportunity')
 
     @api.model_create_multi
+    @profiled('calendar.event.create')
     def create(self, vals_list):
         events = super(CalendarEvent, self).create(vals_list)
         for ev in events:
@@ -895,8 +953,14 @@ class CalendarEvent(models.Model):
                 })
         return events
     
+    @profiled('calendar.event.write')
     def write(self, vals):
+        # moving an installation meeting changes the capacity of both days
+        capacity_tracked = self.filtered('opportunity_id') if {'start', 'stop', 'active'} & set(vals) else self.browse()
+        capacity_starts = capacity_tracked.mapped('start')
         res = super().write(vals)
+        if capacity_tracked:
+            self.env['installation.capacity.day']._mark_dirty(capacity_starts + capacity_tracked.mapped('start'))
         
         # If this is a site visit and it's marked as done, update the opportunity
         if 'state' in vals and vals['state'] == 'done':
@@ -904,12 +968,16 @@ class CalendarEvent(models.Model):
                 if event.opportunity_id and 'Site Visit' in event.name:
                     # Mark site visit as completed and create follow-up activity
                     event.opportunity_id.message_post(
-                        body=f"✅ <b>Site Visit Completed</b><br/>Site assessment finished. Ready for quotation preparation.",
+                        body=render_html("✅ <b>Site Visit Completed</b><br/>Site assessment finished. Ready for quotation preparation."),
                         subject="Site Visit Completed"
                     )
         
         return res
 
+    def unlink(self):
+        self.env['installation.capacity.day']._mark_dirty(self.filtered('opportunity_id').mapped('start'))
+        return super().unlink()
+
 
 # Gallery-friendly image model
 class InstallationPhoto(models.Model):
@@ -918,9 +986,27 @@ class InstallationPhoto(models.Model):
 
     name = fields.Char('Description')
     image = fields.Binary('Image', attachment=True)
-    lead_id = fields.Many2one('crm.lead', string='Opportunity')
+    image_128 = fields.Image('Thumbnail', related='image', max_width=128, max_height=128, store=True)
+    lead_id = fields.Many2one('crm.lead', string='Opportunity', index=True)
+    capture_date = fields.Datetime('Captured On', default=fields.Datetime.now, required=True, index=True)
+
+    def _auto_init(self):
+        # photos uploaded before the capture date existed get their upload time,
+        # not the upgrade time the ORM would fill a new required column with;
+        # truncated to seconds like the gallery cursors
+        cr = self.env.cr
+        if table_exists(cr, self._table):
+            if not column_exists(cr, self._table, 'capture_date'):
+                create_column(cr, self._table, 'capture_date', 'timestamp')
+            cr.execute("""
+                UPDATE installation_photo
+                   SET capture_date = date_trunc('second', create_date)
+                 WHERE capture_date IS NULL
+            """)
+        return super()._auto_init()
 
     @api.model
+    @profiled('installation.photo.create')
     def create(self, vals):
         record = super().create(vals)
 
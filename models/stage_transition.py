@@ -0,0 +1,118 @@
+from odoo import models, api, fields, _
+from odoo.exceptions import UserError
+from odoo.tools import create_index
+
+TRANSITION_SOURCES = [
+    ('manual', 'Manual'),
+    ('create', 'Creation'),
+    ('import', 'Import'),
+    ('automation', 'Automation Rule'),
+    ('cron', 'Scheduled Action'),
+    ('sale_order', 'Sale Order'),
+]
+
+
+class CrmLeadStageTransition(models.Model):
+    """Append-only log of opportunity stage changes, for cycle time analytics"""
+    _name = 'crm.lead.stage.transition'
+    _description = 'Opportunity Stage Transition'
+    _order = 'date desc, id desc'
+    _log_access = False
+
+    lead_id = fields.Many2one('crm.lead', string='Opportunity', required=True, ondelete='cascade')
+    from_stage_id = fields.Many2one('crm.stage', string='From Stage', ondelete='set null')
+    to_stage_id = fields.Many2one('crm.stage', string='To Stage', ondelete='set null')
+    source = fields.Selection(TRANSITION_SOURCES, required=True, default='manual')
+    date = fields.Datetime(required=True, default=fields.Datetime.now, index=True)
+
+    def init(self):
+        # time range scans per stage, and "next transition of this lead" lookups
+        create_index(self._cr, 'crm_lead_stage_transition_to_stage_date_index', self._table, ['to_stage_id', 'date'])
+        create_index(self._cr, 'crm_lead_stage_transition_lead_date_index', self._table, ['lead_id', 'date', 'id'])
+
+    def write(self, vals):
+        raise UserError(_("Stage transitions are append-only and cannot be modified."))
+
+    def unlink(self):
+        if not self.env.su:
+            raise UserError(_("Stage transitions are append-only and cannot be deleted."))
+        return super().unlink()
+
+    @api.model
+    def _record(self, leads, previous_stages, source):
+        """Log the stage change of ``leads`` in one insert; ``previous_stages`` maps lead id to stage id"""
+        now = fields.Datetime.now()
+        vals_list = [{
+            'lead_id': lead.id,
+            'from_stage_id': previous_stages.get(lead.id) or False,
+            'to_stage_id': lead.stage_id.id,
+            'source': source,
+            'date': now,
+        } for lead in leads if lead.stage_id.id != previous_stages.get(lead.id, False)]
+        if vals_list:
+            self.sudo().create(vals_list)
+
+    @api.model
+    def get_cycle_times(self, date_from, date_to, sla_days=None):
+        """Time spent in each stage by the leads that entered it between ``date_from`` and ``date_to``
+
+        Returns one dict per stage with the number of visits, how many are still
+        open, the average / median / 90th percentile duration in days and, when
+        ``sla_days`` is given (a number or a ``{stage_id: days}`` dict), the
+        number of visits that exceeded it (open visits count until now).
+        """
+        if not isinstance(sla_days, dict):
+            sla_days = {None: sla_days}
+        stage_slas = {stage_id: days for stage_id, days in sla_days.items() if stage_id}
+        self.env.cr.execute("""
+            WITH visits AS (
+                SELECT t.to_stage_id AS stage_id,
+                       (EXTRACT(EPOCH FROM COALESCE(nxt.date, NOW() AT TIME ZONE 'UTC') - t.date) / 86400)::float AS days,
+                       nxt.date IS NULL AS open
+                  FROM crm_lead_stage_transition t
+             LEFT JOIN LATERAL (
+                        SELECT n.date
+                          FROM crm_lead_stage_transition n
+                         WHERE n.lead_id = t.lead_id
+                           AND (n.date, n.id) > (t.date, t.id)
+                      ORDER BY n.date, n.id
+                         LIMIT 1
+                       ) nxt ON TRUE
+                 WHERE t.date >= %(date_from)s
+                   AND t.date < %(date_to)s
+                   AND t.to_stage_id IS NOT NULL
+            )
+            SELECT visits.stage_id,
+                   COUNT(*),
+                   COUNT(*) FILTER (WHERE open),
+                   AVG(days) FILTER (WHERE NOT open),
+                   PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY days) FILTER (WHERE NOT open),
+                   PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY days) FILTER (WHERE NOT open),
+                   COUNT(*) FILTER (WHERE days > COALESCE(sla.days, %(default_sla)s))
+              FROM visits
+         LEFT JOIN UNNEST(%(sla_stage_ids)s::int[], %(sla_days)s::float[]) AS sla(stage_id, days)
+                ON sla.stage_id = visits.stage_id
+          GROUP BY visits.stage_id
+        """, {
+            'date_from': date_from,
+            'date_to': date_to,
+            'default_sla': sla_days.get(None),
+            'sla_stage_ids': list(stage_slas),
+            'sla_days': list(stage_slas.values()),
+        })
+        rows = self.env.cr.fetchall()
+        stages = {stage.id: stage for stage in self.env['crm.stage'].browse([row[0] for row in rows])}
+        result = []
+        for stage_id, visits, still_open, avg_days, median_days, p90_days, breaches in rows:
+            has_sla = stage_slas.get(stage_id, sla_days.get(None)) is not None
+            result.append({
+                'stage_id': stage_id,
+                'stage_name': stages[stage_id].name,
+                'visits': visits,
+                'open': still_open,
+                'avg_days': avg_days,
+                'median_days': median_days,
+                'p90_days': p90_days,
+                'sla_breaches': breaches if has_sla else None,
+            })
+        return sorted(result, key=lambda values: (stages[values['stage_id']].sequence, values['stage_id']))
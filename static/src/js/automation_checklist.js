@@ -0,0 +1,50 @@
+/** @odoo-module **/
+
+import { registry } from "@web/core/registry";
+import { useService } from "@web/core/utils/hooks";
+import { standardFieldProps } from "@web/views/fields/standard_field_props";
+import { Component, onWillStart, useState } from "@odoo/owl";
+
+/**
+ * Renders the checklist template referenced by an activity and lets the user
+ * tick items. Tick states are stored server side as one row per ticked item.
+ */
+export class AutomationChecklistField extends Component {
+    setup() {
+        this.orm = useService("orm");
+        this.state = useState({ items: [] });
+        onWillStart(() => this.loadItems());
+    }
+
+    get activityId() {
+        return this.props.record.resId;
+    }
+
+    get progress() {
+        const items = this.state.items.filter((item) => item.display_type === "item");
+        return `${items.filter((item) => item.done).length}/${items.length}`;
+    }
+
+    async loadItems() {
+        if (!this.activityId || !this.props.value) {
+            return;
+        }
+        this.state.items = await this.orm.call("mail.activity", "get_checklist_data", [[this.activityId]]);
+    }
+
+    async onToggle(item) {
+        if (this.props.readonly) {
+            return;
+        }
+        item.done = await this.orm.call("mail.activity", "action_toggle_checklist_item", [
+            [this.activityId],
+            item.id,
+        ]);
+    }
+}
+
+AutomationChecklistField.template = "solar_algarve_automations.AutomationChecklistField";
+AutomationChecklistField.props = { ...standardFieldProps };
+AutomationChecklistField.supportedTypes = ["many2one"];
+
+registry.category("fields").add("automation_checklist", AutomationChecklistField);
@@ -0,0 +1,74 @@
+/** @odoo-module **/
+
+import { registry } from "@web/core/registry";
+import { useService } from "@web/core/utils/hooks";
+import { standardFieldProps } from "@web/views/fields/standard_field_props";
+import { Component, onMounted, onWillUnmount, useRef, useState } from "@odoo/owl";
+
+const PAGE_SIZE = 40;
+
+/**
+ * Lazily loaded gallery of a lead's installation photos. Set on the photo
+ * count field so the form itself never reads the photos; pages are fetched
+ * by cursor when the end of the gallery scrolls into view.
+ */
+export class InstallationPhotoGallery extends Component {
+    setup() {
+        this.rpc = useService("rpc");
+        this.sentinel = useRef("sentinel");
+        this.state = useState({ photos: [], cursor: null, done: false, loading: false, order: "id" });
+        onMounted(() => {
+            this.observer = new IntersectionObserver((entries) => {
+                if (entries.some((entry) => entry.isIntersecting)) {
+                    this.loadMore();
+                }
+            });
+            this.observer.observe(this.sentinel.el);
+        });
+        onWillUnmount(() => this.observer && this.observer.disconnect());
+    }
+
+    get leadId() {
+        return this.props.record.resId;
+    }
+
+    async loadMore() {
+        if (!this.leadId || this.state.loading || this.state.done || !this.props.value) {
+            return;
+        }
+        this.state.loading = true;
+        const order = this.state.order;
+        let page;
+        try {
+            page = await this.rpc(`/crm/lead/${this.leadId}/installation_photos`, {
+                cursor: this.state.cursor,
+                limit: PAGE_SIZE,
+                order,
+            });
+        } finally {
+            this.state.loading = false;
+        }
+        if (order !== this.state.order) {
+            return this.loadMore(); // sort order changed while loading
+        }
+        this.state.photos.push(...page.photos);
+        this.state.cursor = page.next_cursor;
+        this.state.done = !page.next_cursor;
+        // keep loading while the sentinel is still visible (large screens)
+        const rect = this.sentinel.el && this.sentinel.el.getBoundingClientRect();
+        if (!this.state.done && rect && rect.top < window.innerHeight) {
+            this.loadMore();
+        }
+    }
+
+    onChangeOrder(ev) {
+        Object.assign(this.state, { photos: [], cursor: null, done: false, order: ev.target.value });
+        this.loadMore();
+    }
+}
+
+InstallationPhotoGallery.template = "solar_algarve_automations.InstallationPhotoGallery";
+InstallationPhotoGallery.props = { ...standardFieldProps };
+InstallationPhotoGallery.supportedTypes = ["integer"];
+
+registry.category("fields").add("installation_photo_gallery", InstallationPhotoGallery);
@@ -0,0 +1,3 @@
+from . import test_installation_crew
+from . import test_automation_html
+from . import test_external_storage
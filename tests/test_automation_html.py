@@ -0,0 +1,104 @@
+import ast
+import inspect
+from string import Formatter
+
+from lxml import html
+
+from odoo.tests.common import TransactionCase, tagged
+from odoo.tools import html_sanitize
+
+from ..models import sale_order_hooks
+from ..models.automation_html import SanitizedMarkup, render_html
+
+HOSTILE = """<script>alert("x")</script><img src=x onerror=alert(1)> & 'quoted' "double" </b>"""
+
+
+def _automation_templates():
+    """Every literal template rendered by the automation rules
+
+    Templates passed to ``render_html`` directly, and the ``note`` entries of
+    the activity config dicts.
+    """
+    tree = ast.parse(inspect.getsource(sale_order_hooks))
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and getattr(node.func, 'id', None) == 'render_html':
+            if node.args and isinstance(node.args[0], ast.Constant):
+                yield node.args[0].value
+        elif isinstance(node, ast.Dict):
+            for key, value in zip(node.keys, node.values):
+                if isinstance(key, ast.Constant) and key.value == 'note' and isinstance(value, ast.Constant):
+                    yield value.value
+
+
+def _normalize(markup):
+    # same tree, same serialization: quotes and entities spelled the lxml way
+    root = html.fragment_fromstring(str(markup), create_parent='div')
+    return html.tostring(root, encoding='unicode')
+
+
+def _sanitize(markup):
+    # the options of the mail.activity note and mail.message body fields
+    return html_sanitize(
+        markup, silent=True, sanitize_tags=True, sanitize_attributes=True,
+        sanitize_style=True, sanitize_form=True,
+    )
+
+
+@tagged('post_install', '-at_install')
+class TestAutomationHtml(TransactionCase):
+
+    def assertTrustedRender(self, rendered):
+        self.assertIsInstance(rendered, SanitizedMarkup)
+        self.assertEqual(_normalize(_sanitize(rendered)), _normalize(rendered),
+                         "the trusted render differs from what the sanitizer would store")
+        self.assertNotIn('<script', rendered)
+        self.assertNotIn('<img', rendered)
+
+    def test_templates_match_sanitizer(self):
+        templates = set(_automation_templates())
+        self.assertGreater(len(templates), 10, "template discovery found too few templates")
+        for template in templates:
+            with self.subTest(template=template):
+                fields = {name for _text, name, _spec, _conv in Formatter().parse(template) if name}
+                rendered = render_html(template, **dict.fromkeys(fields, HOSTILE))
+                self.assertTrustedRender(rendered)
+                if fields:
+                    self.assertIn('&lt;script&gt;', rendered)
+
+    def test_lead_notes_escape_values(self):
+        lead = self.env['crm.lead'].create({
+            'name': HOSTILE,
+            'contact_name': HOSTILE,
+            'phone': HOSTILE,
+            'email_from': HOSTILE,
+            'street': HOSTILE,
+        })
+        for stage_name in ('New', 'Qualified', 'Proposition', 'Won', 'Ordered', 'Ready to go', 'Commissioned'):
+            stage = self.env['crm.stage'].new({'name': stage_name})
+            with self.subTest(stage=stage_name):
+                note = lead._get_stage_activity_config(stage)['note']
+                self.assertTrustedRender(note)
+                self.assertIn('&lt;script&gt;', note)
+
+    def test_order_link_escapes_order_name(self):
+        partner = self.env['res.partner'].create({'name': 'Customer'})
+        lead = self.env['crm.lead'].create({'name': 'Roof PV', 'partner_id': partner.id})
+        order = self.env['sale.order'].create({'partner_id': partner.id, 'opportunity_id': lead.id})
+        order.write({'name': HOSTILE, 'state': 'sale'})
+        note = lead._get_order_preparation_note()
+        self.assertTrustedRender(note)
+        self.assertIn('&lt;script&gt;', note)
+        self.assertIn(f"href=\"/web#id={order.id}&amp;model=sale.order", _normalize(note))
+
+    def test_fields_store_trusted_markup_and_sanitize_the_rest(self):
+        lead = self.env['crm.lead'].create({'name': 'Roof PV'})
+        trusted = render_html("<h4>{name}</h4>", name=HOSTILE)
+        message = self.env['mail.message'].create({'model': 'crm.lead', 'res_id': lead.id, 'body': trusted})
+        self.assertEqual(message.body, trusted)
+        activity = self.env['mail.activity'].create({
+            'res_model_id': self.env['ir.model']._get_id('crm.lead'),
+            'res_id': lead.id,
+            'summary': 'Test',
+            'note': '<p>note</p><script>alert(1)</script>',
+        })
+        self.assertNotIn('<script', activity.note)
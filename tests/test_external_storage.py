@@ -0,0 +1,172 @@
+import base64
+import io
+import os
+import tempfile
+from unittest.mock import patch
+
+from PIL import Image
+
+from odoo.tests.common import TransactionCase, tagged
+
+from ..models import external_storage
+from ..models.external_storage import EXTERNAL_PREFIX
+from ..models.sale_order_hooks import MODULE
+
+
+class FakeObjectStore:
+    """In-memory stand-in for an S3 compatible client"""
+
+    def __init__(self):
+        self.objects = {}
+        self.gets = 0
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[(Bucket, Key)] = Body.read()
+
+    def get_object(self, Bucket, Key):
+        self.gets += 1
+        return {'Body': io.BytesIO(self.objects[(Bucket, Key)])}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+
+def _png(color):
+    output = io.BytesIO()
+    Image.new('RGB', (300, 200), color).save(output, 'PNG')
+    return output.getvalue()
+
+
+@tagged('post_install', '-at_install')
+class TestExternalStorage(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        set_param = cls.env['ir.config_parameter'].sudo().set_param
+        set_param(f'{MODULE}.external_storage_bucket', 'photos')
+        set_param(f'{MODULE}.external_storage_prefix', 'test/')
+        stage = cls.env['crm.stage'].search([('name', '=', 'Complete')], limit=1)
+        if not stage:
+            stage = cls.env['crm.stage'].create({'name': 'Complete', 'sequence': 100})
+        cls.lead = cls.env['crm.lead'].create({'name': 'Roof PV'})
+        cls.lead.stage_id = stage
+
+    def setUp(self):
+        super().setUp()
+        self.store = FakeObjectStore()
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.cache_dir = cache_dir.name
+        for patcher in (
+            patch.object(external_storage, 'boto3', object()),
+            patch.object(external_storage, '_s3_client', lambda *args: self.store),
+            patch.object(type(self.env['ir.attachment']), '_external_cache_dir', lambda _self: self.cache_dir),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _photo(self, content):
+        return self.env['installation.photo'].create({
+            'name': 'Roof',
+            'image': base64.b64encode(content),
+            'lead_id': self.lead.id,
+        })
+
+    def _attachments(self, photo, field='image'):
+        return self.env['ir.attachment'].search([
+            ('res_model', '=', 'installation.photo'), ('res_id', '=', photo.id), ('res_field', '=', field),
+        ])
+
+    def _chatter_copy(self, checksum):
+        return self.env['ir.attachment'].search([
+            ('res_model', '=', 'crm.lead'), ('res_id', '=', self.lead.id), ('checksum', '=', checksum),
+        ])
+
+    def _cache_file(self, attachment):
+        return os.path.join(self.cache_dir, attachment.store_fname[len(EXTERNAL_PREFIX):])
+
+    def test_offload_read_evict_delete(self):
+        content = _png('red')
+        photo = self._photo(content)
+        original = self._attachments(photo)
+        fname = original.store_fname
+        copy = self._chatter_copy(original.checksum)
+        self.assertEqual(copy.store_fname, fname, "the chatter copy shares the photo file")
+
+        self.env['installation.photo']._cron_offload_photos()
+
+        self.env.invalidate_all()
+        uuid = self.env['ir.config_parameter'].sudo().get_param('database.uuid')
+        object_key = f'test/{uuid}/{fname}'
+        self.assertEqual(original.store_fname, EXTERNAL_PREFIX + object_key, "the full object key is stored")
+        self.assertEqual(copy.store_fname, EXTERNAL_PREFIX + object_key, "attachments sharing the file move together")
+        self.assertFalse(self._attachments(photo, 'image_128').store_fname.startswith(EXTERNAL_PREFIX),
+                         "thumbnails stay local")
+        self.assertEqual(self.store.objects[('photos', object_key)], content)
+
+        # a prefix change does not affect objects already offloaded
+        self.env['ir.config_parameter'].sudo().set_param(f'{MODULE}.external_storage_prefix', 'other/')
+
+        # empty cache: fetched once, then served locally
+        self.assertFalse(os.path.exists(self._cache_file(original)))
+        self.assertEqual(base64.b64decode(photo.image), content)
+        self.assertEqual(self.store.gets, 1)
+        self.env.invalidate_all()
+        self.assertEqual(original.raw, content)
+        self.assertEqual(self.store.gets, 1)
+
+        # what /web/image serves
+        stream = self.env['ir.binary']._get_stream_from(photo, 'image')
+        self.assertEqual(stream.type, 'path')
+        with open(stream.path, 'rb') as streamed:
+            self.assertEqual(streamed.read(), content)
+
+        # a cache of 0 MB keeps only the file fetched last
+        self.env['ir.config_parameter'].sudo().set_param(f'{MODULE}.external_cache_size_mb', '0')
+        other = self._photo(_png('blue'))
+        self.env['installation.photo']._cron_offload_photos()
+        self.env.invalidate_all()
+        other_attachment = self._attachments(other)
+        self.assertTrue(other_attachment.raw)
+        self.assertTrue(os.path.exists(self._cache_file(other_attachment)))
+        self.assertFalse(os.path.exists(self._cache_file(original)), "least recently used file evicted")
+        self.assertEqual(original.raw, content)
+        self.assertEqual(self.store.gets, 3)
+
+        # the object goes once its last attachment is gone, and only after commit
+        key = ('photos', object_key)
+        photo.unlink()
+        self.assertFalse(original.exists())
+        self.env.cr.postcommit.run()
+        self.assertIn(key, self.store.objects, "still used by the chatter copy")
+        copy.unlink()
+        self.assertIn(key, self.store.objects, "deleted only once the transaction commits")
+        self.env.cr.postcommit.run()
+        self.assertNotIn(key, self.store.objects)
+
+    def test_active_projects_stay_local(self):
+        lead = self.env['crm.lead'].create({'name': 'Ongoing'})
+        photo = self.env['installation.photo'].create({
+            'image': base64.b64encode(_png('green')),
+            'lead_id': lead.id,
+        })
+        self.env['installation.photo']._cron_offload_photos()
+        self.assertFalse(self._attachments(photo).store_fname.startswith(EXTERNAL_PREFIX))
+        self.assertFalse(self.store.objects)
+
+    def test_copied_database_keeps_objects(self):
+        content = _png('yellow')
+        photo = self._photo(content)
+        self.env['installation.photo']._cron_offload_photos()
+        self.env.invalidate_all()
+        attachment = self._attachments(photo)
+        copy = self._chatter_copy(attachment.checksum)
+        key = ('photos', attachment.store_fname[len(EXTERNAL_PREFIX):])
+        # a duplicated database gets a new uuid but still points at the same objects
+        self.env['ir.config_parameter'].sudo().set_param('database.uuid', 'copy-of-production')
+        self.assertEqual(attachment.raw, content)
+        photo.unlink()
+        copy.unlink()
+        self.env.cr.postcommit.run()
+        self.assertIn(key, self.store.objects, "objects uploaded by another database are never deleted")
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+import psycopg2
+
+from odoo.exceptions import ValidationError
+from odoo.tests.common import TransactionCase, tagged
+from odoo.tools import mute_logger
+
+from ..models.installation_crew import CREW_EXCLUSION
+
+
+@tagged('post_install', '-at_install')
+class TestInstallationCrew(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env.user.tz = 'UTC'
+        cls.crew = cls.env['installation.crew'].create({'name': 'Crew A', 'work_start': 8.0, 'work_end': 18.0})
+        # a Monday
+        cls.monday = datetime(2030, 1, 7)
+
+    def _book(self, start_hour, hours, crew=None, **vals):
+        start = self.monday + timedelta(hours=start_hour)
+        return self.env['calendar.event'].create(dict({
+            'name': f'Installation {start_hour}h',
+            'start': start,
+            'stop': start + timedelta(hours=hours),
+            'x_crew_id': (crew or self.crew).id,
+        }, **vals))
+
+    def test_overlap_rejected(self):
+        self._book(8, 4)
+        with self.assertRaises(ValidationError):
+            self._book(10, 4)
+
+    def test_adjacent_and_other_crew_allowed(self):
+        self._book(8, 4)
+        self._book(12, 4)
+        other = self.env['installation.crew'].create({'name': 'Crew B'})
+        self._book(9, 4, crew=other)
+
+    def test_move_into_booking_rejected(self):
+        self._book(8, 4)
+        event = self._book(13, 4)
+        with self.assertRaises(ValidationError):
+            event.write({'start': self.monday + timedelta(hours=11)})
+
+    def test_database_rejects_overlap(self):
+        if not self.env['calendar.event']._crew_exclusion_enforced():
+            self.skipTest("btree_gist is not available")
+        self._book(8, 4)
+        event = self._book(13, 4)
+        # what a concurrent transaction that passed the Python check would write
+        with self.assertRaises(psycopg2.errors.ExclusionViolation), mute_logger('odoo.sql_db'):
+            with self.env.cr.savepoint():
+                self.env.cr.execute(f"SET CONSTRAINTS {CREW_EXCLUSION} IMMEDIATE")
+                self.env.cr.execute("UPDATE calendar_event SET start = %s WHERE id = %s",
+                                    [self.monday + timedelta(hours=10), event.id])
+
+    def test_archived_event_frees_slot(self):
+        self._book(8, 4).active = False
+        self._book(8, 4)
+
+    def test_next_free_slot(self):
+        CalendarEvent = self.env['calendar.event']
+        date_from = self.monday + timedelta(hours=6)
+        self.assertEqual(CalendarEvent._find_next_free_slot(self.crew, 4.0, date_from=date_from),
+                         self.monday + timedelta(hours=8))
+        self._book(8, 4)
+        self._book(13, 4)
+        # 12h-13h is too short, 17h-18h too: next is Tuesday morning
+        self.assertEqual(CalendarEvent._find_next_free_slot(self.crew, 4.0, date_from=date_from),
+                         self.monday + timedelta(days=1, hours=8))
+        self.assertEqual(CalendarEvent._find_next_free_slot(self.crew, 1.0, date_from=date_from),
+                         self.monday + timedelta(hours=12))
+
+    def test_schedule_installation_proposes_free_slot(self):
+        lead = self.env['crm.lead'].create({'name': 'Roof PV', 'x_installation_crew_id': self.crew.id})
+        context = lead.action_schedule_installation()['context']
+        self.assertEqual(context['default_x_crew_id'], self.crew.id)
+        self.assertIn('default_start', context)